@@ -0,0 +1,263 @@
+"""
+Overlapped compute / draw / encode pipeline for exporting animations as GIFs
+"""
+
+import collections
+import hashlib
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from gif_encoder import write_delta_gif
+
+def quantize_frame(rgba):
+    """Convert an (h, w, 4) RGBA frame into a 256-colour palette image for GIF encoding"""
+    return Image.fromarray(rgba, 'RGBA').convert('RGB').quantize(colors=256)
+
+def capture_frame(fig):
+    """Draw the figure and return a copy of its Agg canvas as an (h, w, 4) uint8 array"""
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+class FrameRing:
+    """
+    Fixed set of preallocated (h, w, 4) frame slots shared by the draw and encode stages.
+
+    capture(fig) draws the figure and copies its Agg buffer, wrapped as a NumPy view
+    without any intermediate bytes or PIL image, into a free slot: one memcpy per frame.
+    It blocks while every slot is still waiting to be encoded. Encoders read a slot with
+    ring[slot] and hand it back with release(slot), so frame memory is allocated once,
+    on the first capture, and stays at n_slots frames for the whole export.
+    """
+
+    def __init__(self, n_slots):
+        self.n_slots = n_slots
+        self.slots = None
+        self._free = queue.Queue()
+        for slot in range(n_slots):
+            self._free.put(slot)
+
+    def capture(self, fig):
+        """Draw the figure into a free slot and return the slot index"""
+        fig.canvas.draw()
+        view = np.asarray(fig.canvas.buffer_rgba())
+        if self.slots is None:
+            self.slots = np.empty((self.n_slots,) + view.shape, dtype=np.uint8)
+        elif view.shape != self.slots.shape[1:]:
+            raise ValueError(f"Canvas changed size from {self.slots.shape[1:]} to {view.shape} during capture")
+
+        slot = self._free.get()
+        np.copyto(self.slots[slot], view)
+        return slot
+
+    def __getitem__(self, slot):
+        return self.slots[slot]
+
+    def release(self, slot):
+        self._free.put(slot)
+
+def collapse_frame_sequence(sequence, duration, loop=0):
+    """
+    Shrink a per-frame list of unique-frame indices for GIF/APNG output.
+
+    With infinite looping (loop=0) a sequence that repeats a shorter period is cut to one
+    period, then runs of the same frame are merged into one frame with a longer duration.
+    Returns (unique indices, durations in ms).
+    """
+    sequence = list(sequence)
+    n = len(sequence)
+    if loop == 0:
+        for period in range(1, n // 2 + 1):
+            if n % period == 0 and all(sequence[i] == sequence[i % period] for i in range(n)):
+                sequence = sequence[:period]
+                break
+
+    indices, durations = [], []
+    for index in sequence:
+        if indices and indices[-1] == index:
+            durations[-1] += duration
+        else:
+            indices.append(index)
+            durations.append(duration)
+
+    # A looping sequence that starts and ends on the same frame can merge across the wrap
+    if loop == 0 and len(indices) > 1 and indices[0] == indices[-1]:
+        durations[0] += durations.pop()
+        indices.pop()
+    return indices, durations
+
+def export_animation_pipelined(fig, compute_frame, draw_frame, frames, filename, fps=30,
+                               dpi=None, queue_size=4, compute_workers=2, encode_workers=2,
+                               compute_in_processes=False, loop=0, state_key=None,
+                               dedupe_rendered=False, frame_store=None, palette=None):
+    """
+    Export an animation with its three stages running concurrently.
+
+    compute_frame(frame) returns the physics state of one frame and runs on a worker
+    pool: threads by default, since NumPy releases the GIL on large arrays, or processes
+    with compute_in_processes=True (compute_frame must then be a module-level function).
+    draw_frame(state) updates the figure's artists and runs on the calling thread, as
+    matplotlib is not thread-safe. Captured frames are quantized by encode threads
+    (Pillow releases the GIL while quantizing). At most queue_size frames are waiting
+    between consecutive stages, so frame N+1 is computed while frame N is drawn and
+    frame N-1 encoded. Captured frames live in a preallocated FrameRing, so capturing a
+    frame costs one copy of the canvas buffer and no allocation, and the RGBA frames in
+    flight never exceed the ring. Encoded frames (one palette byte per pixel) are kept
+    until the end, since the frame order and durations of the GIF are only known once
+    every frame has been deduplicated; with both a palette and a frame_store they are read
+    back from disk one at a time while the GIF is written instead.
+
+    Repeated frames are drawn and encoded only once. state_key(state) should return a
+    hashable value that is equal for frames with identical physics (e.g. the position
+    within one period of a cyclic motion); with dedupe_rendered=True the captured RGBA
+    buffers are hashed as well. Repeats are written using frame durations and, for
+    infinitely looping output, by cutting the animation to a single period.
+
+    With a frame_store (see frame_store.FrameStore) finished frames are checkpointed to
+    disk as they are encoded; a re-run with the same store skips every stored frame and
+    the GIF is only assembled once all frames exist.
+
+    With a palette (a gif_encoder.ScenePalette) GIF frames are mapped through its lookup
+    table instead of being quantized one by one, and only the region that changed since
+    the previous frame is stored. An unfitted palette is fitted on the first frame.
+    """
+    frames = list(frames)
+    if not frames:
+        raise ValueError("Cannot export an animation with no frames")
+    if not filename.lower().endswith('.gif'):
+        palette = None
+    encode_queue = queue.Queue(maxsize=queue_size)
+    encoded = {}
+    errors = []
+
+    # Position of the first identical frame for every output frame, and the frames
+    # already seen by state key ('state:' + repr) or buffer hash ('rgba:' + hex digest)
+    sequence = [None] * len(frames)
+    seen = {}
+    todo = list(range(len(frames)))
+    if frame_store is not None:
+        for position in range(len(frames)):
+            if position in frame_store:
+                sequence[position] = frame_store.source_of(position)
+        seen.update(frame_store.tokens)
+        todo = [position for position in todo if sequence[position] is None]
+        if len(todo) < len(frames):
+            print(f"Resuming: {len(frames) - len(todo)} of {len(frames)} frames already rendered")
+
+    # Every queued frame, every frame being encoded and the frame being captured holds a slot
+    ring = FrameRing(queue_size + encode_workers + 1)
+
+    def encoder():
+        while True:
+            item = encode_queue.get()
+            if item is None:
+                break
+            position, slot, tokens = item
+            try:
+                if frame_store is not None:
+                    frame_store.put(position, ring[slot], tokens)
+                # With a palette and a store, frames are mapped from disk while writing
+                if palette is not None:
+                    if frame_store is None:
+                        encoded[position] = palette.map(ring[slot])
+                else:
+                    encoded[position] = quantize_frame(ring[slot])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                ring.release(slot)
+
+    def record_repeat(position, source):
+        sequence[position] = source
+        if frame_store is not None:
+            frame_store.link(position, source)
+
+    encoder_threads = [threading.Thread(target=encoder, daemon=True) for _ in range(encode_workers)]
+    for thread in encoder_threads:
+        thread.start()
+
+    original_dpi = fig.dpi
+    if dpi is not None:
+        fig.set_dpi(dpi)
+
+    executor_class = ProcessPoolExecutor if compute_in_processes else ThreadPoolExecutor
+    try:
+        with executor_class(max_workers=compute_workers) as executor:
+            todo_iter = iter(todo)
+            pending = collections.deque()
+
+            # Keep queue_size frames in flight in the compute stage
+            for position in todo_iter:
+                pending.append((position, executor.submit(compute_frame, frames[position])))
+                if len(pending) == queue_size:
+                    break
+
+            while pending:
+                position, future = pending.popleft()
+                state = future.result()
+                next_position = next(todo_iter, None)
+                if next_position is not None:
+                    pending.append((next_position, executor.submit(compute_frame, frames[next_position])))
+
+                tokens = []
+                if state_key is not None:
+                    tokens.append('state:' + repr(state_key(state)))
+                    if tokens[-1] in seen:
+                        record_repeat(position, seen[tokens[-1]])
+                        continue
+
+                draw_frame(state)
+                slot = ring.capture(fig)
+
+                if dedupe_rendered:
+                    tokens.append('rgba:' + hashlib.blake2b(ring[slot], digest_size=16).hexdigest())
+                    if tokens[-1] in seen:
+                        ring.release(slot)
+                        source = seen[tokens[-1]]
+                        record_repeat(position, source)
+                        for token in tokens:
+                            seen[token] = source
+                        continue
+
+                for token in tokens:
+                    seen[token] = position
+                sequence[position] = position
+                if palette is not None and not palette.ready:
+                    palette.fit(ring[slot])
+
+                # Blocks when the encoders fall behind (backpressure)
+                encode_queue.put((position, slot, tokens))
+
+                if errors:
+                    break
+    finally:
+        for _ in encoder_threads:
+            encode_queue.put(None)
+        for thread in encoder_threads:
+            thread.join()
+        fig.set_dpi(original_dpi)
+
+    if errors:
+        raise errors[0]
+
+    indices, durations = collapse_frame_sequence(sequence, round(1000 / fps), loop)
+    if palette is not None:
+        if frame_store is not None:
+            if not palette.ready:
+                palette.fit(frame_store.load(indices[0]))
+            images = (palette.map(frame_store.load(i)) for i in indices)
+        else:
+            images = (encoded[i] for i in indices)
+        return write_delta_gif(filename, images, durations, palette, loop)
+    if frame_store is not None:
+        # Frames rendered in earlier runs are only on disk; quantize them in parallel
+        resumed = [i for i in indices if i not in encoded]
+        with ThreadPoolExecutor(max_workers=encode_workers) as executor:
+            encoded.update(zip(resumed, executor.map(lambda i: quantize_frame(frame_store.load(i)), resumed)))
+    images = [encoded[i] for i in indices]
+    images[0].save(filename, save_all=True, append_images=images[1:],
+                   duration=durations, loop=loop)
+    return filename
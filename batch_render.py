@@ -0,0 +1,253 @@
+"""
+Declarative scene configs and a local job scheduler for batch rendering
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+from animation_pipeline import export_animation_pipelined
+from em_wave_propagation import (build_2d_propagation_scene, build_3d_propagation_scene,
+                                 compute_2d_propagation_frame, compute_3d_propagation_frame)
+from field_dataset import FieldDatasetWriter, open_field_dataset
+
+# Scene types a config can use, with their physics and output defaults
+SCENE_TYPES = {
+    'propagation_2d': {
+        'compute': compute_2d_propagation_frame,
+        'build': build_2d_propagation_scene,
+        'physics': {'frames': 300, 'n_grid': 150, 'extent': 6.0, 'dt': 0.08},
+        'output': {'fps': 60, 'dpi': 100, 'figsize': [10, 8], 'cmap': 'RdBu_r'},
+    },
+    'propagation_3d': {
+        'compute': compute_3d_propagation_frame,
+        'build': build_3d_propagation_scene,
+        'physics': {'frames': 300, 'n_grid': 40, 'extent': 5.0, 'dt': 0.1},
+        'output': {'fps': 60, 'dpi': 80, 'figsize': [12, 9], 'cmap': 'RdYlBu_r'},
+    },
+}
+
+def load_scene_config(path):
+    """
+    Read a JSON or TOML scene config. The top level holds a list of scenes, each with a
+    name, a type from SCENE_TYPES, optional physics overrides and a list of outputs:
+
+        [[scenes]]
+        name = "wave_2d"
+        type = "propagation_2d"
+        n_grid = 150
+        frames = 300
+
+        [[scenes.outputs]]
+        filename = "em_wave_2d_propagation.gif"
+        dpi = 100
+        deadline = 600    # seconds after the batch starts
+    """
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise RuntimeError("TOML configs need Python 3.11+ (tomllib); use JSON instead")
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+    else:
+        with open(path) as f:
+            config = json.load(f)
+
+    for scene in config.get('scenes', []):
+        if scene.get('type') not in SCENE_TYPES:
+            raise ValueError(f"Scene '{scene.get('name')}' has unknown type '{scene.get('type')}'")
+        scene_type = SCENE_TYPES[scene['type']]
+        allowed = {'name', 'type', 'outputs'} | set(scene_type['physics'])
+        unknown = set(scene) - allowed
+        if unknown:
+            raise ValueError(f"Scene '{scene.get('name')}' has unknown keys {sorted(unknown)}")
+        for output in scene.get('outputs', []):
+            unknown = set(output) - ({'filename', 'deadline'} | set(scene_type['output']))
+            if unknown or 'filename' not in output:
+                raise ValueError(f"Output {output} of scene '{scene.get('name')}' is invalid")
+    return config
+
+def _hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+class Job:
+    """One unit of scheduled work: a physics stage or the rendering of one output"""
+
+    def __init__(self, key, description, function, args, cost, deadline=None, depends_on=()):
+        self.key = key
+        self.description = description
+        self.function = function
+        self.args = args
+        self.cost = cost
+        self.deadline = deadline
+        self.depends_on = tuple(depends_on)
+
+def compute_physics_job(scene_type, physics, dataset_path):
+    """Evaluate every frame of a scene once into a field dataset shared by its outputs"""
+    if os.path.exists(os.path.join(dataset_path, 'dataset.json')):
+        return dataset_path
+
+    compute = SCENE_TYPES[scene_type]['compute']
+    grid_args = {name: physics[name] for name in ('n_grid', 'extent', 'dt')}
+    _, _, X, Y, _ = compute(0, **grid_args)
+    with FieldDatasetWriter(dataset_path, X.shape, dtype=np.float64,
+                            coords={'x': X[0], 'y': Y[:, 0]},
+                            params={'scene_type': scene_type, **physics}) as writer:
+        for frame in range(physics['frames']):
+            _, t, _, _, Z = compute(frame, **grid_args)
+            writer.append(Z, t=t)
+    return dataset_path
+
+def render_output_job(scene_type, physics, output, dataset_path):
+    """Render one output of a scene from its precomputed field dataset"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    dataset = open_field_dataset(dataset_path)
+    X, Y = np.meshgrid(dataset.coords['x'], dataset.coords['y'])
+
+    def compute_frame(frame):
+        return frame, dataset.times[frame], X, Y, dataset[frame]
+
+    options = {name: output.get(name, default) for name, default in SCENE_TYPES[scene_type]['output'].items()}
+    options['figsize'] = tuple(options['figsize'])
+    # A file left by an earlier run must not pass for this one's output
+    if os.path.exists(output['filename']):
+        os.remove(output['filename'])
+
+    fig, stages = SCENE_TYPES[scene_type]['build'](compute_frame, physics['frames'], **options)
+    try:
+        export_animation_pipelined(fig, compute_frame, stages['draw_frame'], stages['frames'],
+                                   output['filename'], fps=stages['fps'], dpi=stages['dpi'],
+                                   palette=stages['palette'])
+    finally:
+        plt.close(fig)
+    return output['filename']
+
+def expand_jobs(config, cache_dir='scene_cache'):
+    """
+    Expand scenes into jobs. Outputs whose scenes have identical physics share one
+    physics job; costs are estimated as grid points x frames (x dpi for renders)
+    """
+    physics_jobs = {}
+    render_jobs = []
+
+    for scene in config.get('scenes', []):
+        scene_type = SCENE_TYPES[scene['type']]
+        physics = {name: scene.get(name, default) for name, default in scene_type['physics'].items()}
+        physics_key = 'physics:' + _hash({'type': scene['type'], **physics})
+        grid_frames = physics['n_grid']**2 * physics['frames']
+
+        for output in scene.get('outputs', []):
+            if physics_key not in physics_jobs:
+                dataset_path = os.path.join(cache_dir, physics_key.split(':')[1])
+                physics_jobs[physics_key] = Job(physics_key, f"{scene['name']} physics",
+                                                compute_physics_job,
+                                                (scene['type'], physics, dataset_path), grid_frames)
+            physics_job = physics_jobs[physics_key]
+
+            dpi = output.get('dpi', scene_type['output']['dpi'])
+            deadline = output.get('deadline')
+            render_jobs.append(Job('render:' + output['filename'], f"{scene['name']} -> {output['filename']}",
+                                   render_output_job,
+                                   (scene['type'], physics, output, physics_job.args[2]),
+                                   grid_frames * dpi, deadline, depends_on=[physics_key]))
+
+            # A shared physics stage is due as early as its most urgent output
+            if deadline is not None:
+                physics_job.deadline = min(deadline, physics_job.deadline or np.inf)
+
+    return list(physics_jobs.values()) + render_jobs
+
+def run_jobs(jobs, n_workers=None, policy='cheapest'):
+    """
+    Run jobs on a local process pool once their dependencies are done, choosing among
+    ready jobs cheapest-first or earliest-deadline-first. Returns {job key: result or exception}
+    """
+    if policy == 'cheapest':
+        priority = lambda job: job.cost
+    elif policy == 'deadline':
+        priority = lambda job: (job.deadline if job.deadline is not None else np.inf, job.cost)
+    else:
+        raise ValueError("policy must be 'cheapest' or 'deadline'")
+
+    n_workers = n_workers or os.cpu_count() or 1
+    pending = {job.key: job for job in jobs}
+    results = {}
+    running = {}
+    start = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        while pending or running:
+            # Jobs whose dependencies failed can never run
+            for job in list(pending.values()):
+                failed = [key for key in job.depends_on if isinstance(results.get(key), Exception)]
+                if failed:
+                    results[job.key] = RuntimeError(f"Dependency {failed[0]} failed")
+                    del pending[job.key]
+                    print(f"✗ Skipped {job.description}: dependency failed")
+
+            ready = sorted((job for job in pending.values()
+                            if all(key in results for key in job.depends_on)), key=priority)
+            for job in ready[:n_workers - len(running)]:
+                del pending[job.key]
+                running[executor.submit(job.function, *job.args)] = job
+
+            if not running:
+                # Nothing can finish, so dependencies that are neither done nor pending
+                # (unknown keys, cycles) will never be met
+                missing = {job.key: next(key for key in job.depends_on if key not in results)
+                           for job in pending.values()}
+                for job in pending.values():
+                    results[job.key] = RuntimeError(f"Dependency {missing[job.key]} can never run")
+                    print(f"✗ Skipped {job.description}: dependency {missing[job.key]} can never run")
+                pending.clear()
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                elapsed = time.monotonic() - start
+                try:
+                    results[job.key] = future.result()
+                    late = job.deadline is not None and elapsed > job.deadline
+                    print(f"✓ {job.description} done at {elapsed:.1f} s"
+                          + (f" (missed deadline {job.deadline} s)" if late else ""))
+                except Exception as e:
+                    results[job.key] = e
+                    print(f"✗ {job.description} failed: {e}")
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render every output described by scene configs")
+    parser.add_argument('configs', nargs='+', help="JSON or TOML scene config files")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--policy', choices=['cheapest', 'deadline'], default='cheapest')
+    parser.add_argument('--cache-dir', default='scene_cache', help="Where shared physics stages are stored")
+    args = parser.parse_args()
+
+    jobs = []
+    for path in args.configs:
+        for job in expand_jobs(load_scene_config(path), args.cache_dir):
+            if job.key not in {existing.key for existing in jobs}:
+                jobs.append(job)
+
+    n_physics = sum(job.key.startswith('physics:') for job in jobs)
+    print(f"Scheduling {len(jobs) - n_physics} outputs sharing {n_physics} physics stages...")
+    for job in sorted(jobs, key=lambda job: job.cost):
+        print(f"  {job.description}: estimated cost {job.cost:.2e}")
+
+    results = run_jobs(jobs, args.workers, args.policy)
+    failures = [key for key, result in results.items() if isinstance(result, Exception)]
+    print(f"\nBatch complete: {len(results) - len(failures)} of {len(results)} jobs succeeded")
@@ -0,0 +1,149 @@
+"""
+Fast draft previews of animation scenes with automatic level of detail
+"""
+
+import functools
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from animation_pipeline import capture_frame, export_animation_pipelined, quantize_frame
+
+class DraftSettings:
+    """
+    Level of detail for rendering a scene.
+
+    Every frame_step-th frame is rendered (see frames), at dpi_scale times the export
+    dpi. Scene builders compute their fields on grids thinned by grid_step (see grid;
+    fields supplied from elsewhere are thinned when drawn, see decimate), scale counts of
+    arrows, field lines and similar artists by density (see count) and skip contour
+    lines unless contour_lines is set.
+    """
+
+    def __init__(self, frame_step=1, grid_step=1, dpi_scale=1.0, density=1.0, contour_lines=True):
+        self.frame_step = frame_step
+        self.grid_step = grid_step
+        self.dpi_scale = dpi_scale
+        self.density = density
+        self.contour_lines = contour_lines
+
+    def __repr__(self):
+        return (f"DraftSettings(frame_step={self.frame_step}, grid_step={self.grid_step}, "
+                f"dpi_scale={self.dpi_scale}, density={self.density}, contour_lines={self.contour_lines})")
+
+    def count(self, n, minimum=1):
+        """Number of artists to draw where the full-quality scene draws n"""
+        return max(minimum, int(round(n * self.density)))
+
+    def frames(self, frames):
+        """Frames to render where the full-quality scene renders frames"""
+        return list(frames)[::self.frame_step]
+
+    def grid(self, n, minimum=2):
+        """Grid points per axis to compute where the full-quality scene computes n"""
+        return max(minimum, -(-n // self.grid_step))
+
+    def compute_stage(self, compute_frame, default_compute, n_grid, **kwargs):
+        """
+        Compute stage of a scene and the thinning its draw stage applies. The scene's own
+        physics (compute_frame None) is default_compute(frame, n_grid=..., **kwargs) on the
+        draft grid; fields supplied by the caller are computed as given and decimated when drawn
+        """
+        if compute_frame is None:
+            return functools.partial(default_compute, n_grid=self.grid(n_grid), **kwargs), FULL_QUALITY.decimate
+        return compute_frame, self.decimate
+
+    def decimate(self, *arrays):
+        """Every grid_step-th sample along each axis of gridded arrays"""
+        step = (slice(None, None, self.grid_step),)
+        thinned = tuple(np.asarray(a)[step * np.ndim(a)] for a in arrays)
+        return thinned if len(thinned) > 1 else thinned[0]
+
+FULL_QUALITY = DraftSettings()
+
+# Progressively cheaper levels, tried in order until a preview fits its time budget
+DRAFT_LEVELS = (
+    DraftSettings(frame_step=2, grid_step=2, dpi_scale=0.6, density=0.6, contour_lines=False),
+    DraftSettings(frame_step=4, grid_step=3, dpi_scale=0.45, density=0.4, contour_lines=False),
+    DraftSettings(frame_step=8, grid_step=4, dpi_scale=0.3, density=0.25, contour_lines=False),
+    DraftSettings(frame_step=16, grid_step=6, dpi_scale=0.25, density=0.15, contour_lines=False),
+)
+
+def _seconds_per_frame(fig, stages, dpi, n_probe=2):
+    """Time compute, draw, capture and quantize of a few frames from the middle of the scene"""
+    frames = list(stages['frames'])
+    middle = len(frames) // 2
+    probe = frames[middle:middle + n_probe] or frames[:1]
+
+    original_dpi = fig.dpi
+    fig.set_dpi(dpi)
+    try:
+        start = time.perf_counter()
+        for frame in probe:
+            stages['draw_frame'](stages['compute_frame'](frame))
+            quantize_frame(capture_frame(fig))
+        return (time.perf_counter() - start) / len(probe)
+    finally:
+        fig.set_dpi(original_dpi)
+
+def render_preview(build_scene, filename='preview.gif', budget=20.0, levels=DRAFT_LEVELS):
+    """
+    Render a draft of a scene within roughly budget seconds of wall-clock time.
+
+    build_scene(draft) builds the scene at the given DraftSettings and returns
+    (fig, stages), with stages holding compute_frame, draw_frame, frames (already thinned
+    by draft.frame_step), fps and, optionally, dpi, state_key and palette. The same
+    builder called with FULL_QUALITY gives the final export. Levels are probed in order
+    by timing a few frames, and the first whose estimated export time fits what is left
+    of the budget after building and probing (or the last one) is rendered. Returns the
+    DraftSettings used.
+    """
+    start = time.perf_counter()
+    for draft in levels:
+        fig, stages = build_scene(draft)
+        frames = list(stages['frames'])
+        dpi = (stages.get('dpi') or fig.dpi) * draft.dpi_scale
+        estimate = _seconds_per_frame(fig, stages, dpi) * len(frames)
+        remaining = budget - (time.perf_counter() - start)
+        if estimate <= remaining or draft is levels[-1]:
+            break
+        plt.close(fig)
+
+    print(f"Preview at {draft}: {len(frames)} frames, estimated {estimate:.1f} s "
+          f"of {max(remaining, 0):.1f} s left after probing")
+    try:
+        export_animation_pipelined(fig, stages['compute_frame'], stages['draw_frame'], frames,
+                                   filename, fps=max(stages['fps'] / draft.frame_step, 1), dpi=dpi,
+                                   state_key=stages.get('state_key'), palette=stages.get('palette'))
+    finally:
+        plt.close(fig)
+    print(f"Preview saved as {filename} in {time.perf_counter() - start:.1f} s")
+    return draft
+
+if __name__ == "__main__":
+    import argparse
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    from electric_field_propagation_nearfield import build_nearfield_scene
+    from em_wave_propagation import build_2d_propagation_scene, build_3d_propagation_scene
+    from static_electron_field_in_3d_space import build_field_rotation_scene
+    from volumetric_propagation import build_volumetric_propagation_scene
+
+    scenes = {
+        'propagation_2d': lambda draft: build_2d_propagation_scene(draft=draft),
+        'propagation_3d': lambda draft: build_3d_propagation_scene(draft=draft),
+        'propagation_volume': lambda draft: build_volumetric_propagation_scene(draft=draft),
+        'field_rotation': lambda draft: build_field_rotation_scene(draft=draft),
+        'nearfield': lambda draft: build_nearfield_scene(draft=draft),
+    }
+
+    parser = argparse.ArgumentParser(description="Render a quick draft of a scene")
+    parser.add_argument('scene', choices=sorted(scenes))
+    parser.add_argument('--budget', type=float, default=20.0, help="Target wall-clock seconds")
+    parser.add_argument('--output', default=None, help="GIF filename (default: <scene>_preview.gif)")
+    args = parser.parse_args()
+
+    render_preview(scenes[args.scene], args.output or f'{args.scene}_preview.gif', args.budget)
@@ -8,6 +8,11 @@ from matplotlib.patches import Circle, FancyArrowPatch
 from matplotlib.animation import FuncAnimation, PillowWriter
 import matplotlib.patches as patches
 
+from animation_pipeline import export_animation_pipelined
+from draft_preview import FULL_QUALITY
+from frame_store import FrameStore
+from gif_encoder import ScenePalette
+
 # Physical constants
 k = 8.99e9  # Coulomb's constant (N⋅m²/C²)
 e = 1.602e-19  # Elementary charge (C)
@@ -35,9 +40,33 @@ def electric_field_at_point(x, y, charge_x, charge_y, charge):
     
     return Ex, Ey, E_magnitude, r
 
-def create_animated_field_with_components():
+def compute_electron_frame(frame, n_frames=60, y_range=0.5, test_x=1.0, test_y=0.0, electron_x=0.0):
     """
-    Create 1080p animated visualization with original component sizes
+    Physics stage of the 1080p animation: electron position and field at the test point.
+    The electron completes two oscillations over n_frames, so the state also carries the
+    frame's position within one period, which is identical for frames a period apart
+    """
+    # Calculate current electron y position
+    t = frame / n_frames * 4 * np.pi
+    electron_y = y_range * np.sin(t)
+    
+    # Calculate electric field at test point
+    Ex, Ey, E_magnitude, distance = electric_field_at_point(test_x, test_y, 
+                                                           electron_x, electron_y, 
+                                                           electron_charge)
+    
+    cycle_position = (2 * frame) % n_frames
+    return cycle_position, electron_y, Ex, Ey, E_magnitude, distance
+
+def electron_frame_key(state):
+    """Frames with the same position in the oscillation period render identically"""
+    return state[0]
+
+def build_nearfield_scene(draft=FULL_QUALITY):
+    """
+    Figure and pipeline stages of the 1080p visualization with original component sizes.
+    draft (see draft_preview.DraftSettings) thins the frames; the physics is a single
+    test point, so there is no grid to coarsen
     """
     # Test point position (fixed)
     test_x, test_y = 1.0, 0.0
@@ -115,19 +144,12 @@ def create_animated_field_with_components():
     # Scale factor - ORIGINAL
     scale_factor = 2e8
     
-    def animate(frame):
-        # Calculate current electron y position
-        t = frame / n_frames * 4 * np.pi
-        electron_y = y_range * np.sin(t)
+    def draw_frame(state):
+        _, electron_y, Ex, Ey, E_magnitude, distance = state
         
         # Update electron position
         electron_circle.center = (electron_x, electron_y)
         
-        # Calculate electric field at test point
-        Ex, Ey, E_magnitude, distance = electric_field_at_point(test_x, test_y, 
-                                                               electron_x, electron_y, 
-                                                               electron_charge)
-        
         # Update distance line
         distance_line.set_data([electron_x, test_x], [electron_y, test_y])
         
@@ -154,9 +176,8 @@ def create_animated_field_with_components():
         # Return empty list to avoid blit issues
         return []
     
-    # Create animation with conservative settings
-    anim = FuncAnimation(fig, animate, frames=n_frames, interval=33, 
-                        blit=False, repeat=True, cache_frame_data=False)
+    def compute_frame(frame):
+        return compute_electron_frame(frame, n_frames, y_range, test_x, test_y, electron_x)
     
     # Add annotations - ORIGINAL sizes
     ax.text(0.5, -0.7, '← Electron oscillates from y = -0.5m to +0.5m →', 
@@ -168,12 +189,75 @@ def create_animated_field_with_components():
     ax.text(test_x + 0.15, test_y + 0.1, 'E⃗total', fontsize=12, color='green', 
             weight='bold', alpha=0.5)
     
-    return fig, anim
+    stages = {
+        'compute_frame': compute_frame,
+        'draw_frame': draw_frame,
+        'frames': draft.frames(range(n_frames)),
+        'fps': 30,
+        'state_key': electron_frame_key,
+        'palette': ScenePalette(colors=['red', 'blue', 'green', 'lightyellow', 'lightgreen']),
+        # Everything that changes the rendered frames, used to key resumable frame stores
+        'params': {
+            'scene': 'electric_field_nearfield',
+            'n_frames': n_frames,
+            'y_range': y_range,
+            'test_point': [test_x, test_y],
+            'figsize': [19.2, 10.8],
+            'dpi': 100,
+            'scale_factor': scale_factor,
+        },
+    }
+    
+    return fig, stages
 
-def save_gif_robust(fig, anim, filename='electric_field_1080p.gif'):
+def _scene_animation(fig, stages):
+    """FuncAnimation playing the scene's stages on its figure"""
+    def animate(frame):
+        return stages['draw_frame'](stages['compute_frame'](frame))
+    
+    # Create animation with conservative settings
+    return FuncAnimation(fig, animate, frames=stages['frames'], interval=33,
+                         blit=False, repeat=True, cache_frame_data=False)
+
+def create_animated_field_with_components():
+    """
+    Create 1080p animated visualization with original component sizes
+    """
+    fig, stages = build_nearfield_scene()
+    return fig, _scene_animation(fig, stages)
+
+def export_with_checkpoints(fig, stages, filename, frame_store_root='frames', dpi=None):
     """
-    Robust GIF saving method
+    Pipelined export that checkpoints finished frames under frame_store_root.
+    Re-running with the same scene parameters skips frames that were already rendered
     """
+    params = dict(stages['params'], dpi=dpi or stages['params']['dpi'],
+                  figsize=[float(size) for size in fig.get_size_inches()])
+    store = FrameStore.for_scene(frame_store_root, params)
+    export_animation_pipelined(fig, stages['compute_frame'], stages['draw_frame'],
+                               stages['frames'], filename, fps=stages['fps'], dpi=dpi,
+                               state_key=stages['state_key'], dedupe_rendered=True,
+                               frame_store=store, palette=stages['palette'])
+
+def save_gif_robust(fig, anim, filename='electric_field_1080p.gif', stages=None,
+                    frame_store_root='frames'):
+    """
+    Robust GIF saving method. With the pipeline stages from build_nearfield_scene,
+    repeated oscillation periods are rendered once and looped, and finished frames are
+    checkpointed so a failed or interrupted export resumes where it stopped
+    """
+    if stages is not None:
+        for attempt in (1, 2):
+            try:
+                # Method 0: Pipelined export with resumable frame store
+                print(f"Attempting Method 0 (try {attempt}): Pipelined export with checkpoints...")
+                export_with_checkpoints(fig, stages, filename, frame_store_root)
+                print(f"✓ Success! Saved as '{filename}'")
+                return True
+            except Exception as e0:
+                print(f"Method 0 failed: {e0}")
+    
+    
     try:
         # Method 1: Simple PillowWriter
         print("Attempting Method 1: Simple PillowWriter...")
@@ -196,11 +280,18 @@ def save_gif_robust(fig, anim, filename='electric_field_1080p.gif'):
             print(f"Method 2 failed: {e2}")
             
             try:
-                # Method 3: Lower quality fallback
+                # Method 3: Lower quality fallback on the same figure, shrunk to 1080x607
                 print("Attempting Method 3: Lower quality fallback...")
-                fig_small = plt.figure(figsize=(12, 6.75), dpi=90)  # 1080x607
-                # Re-create animation with smaller figure...
-                anim.save('electric_field_smaller.gif', writer='pillow', fps=30)
+                original_size = fig.get_size_inches()
+                fig.set_size_inches(12, 6.75)
+                try:
+                    if stages is not None:
+                        export_with_checkpoints(fig, stages, 'electric_field_smaller.gif',
+                                                frame_store_root, dpi=90)
+                    else:
+                        anim.save('electric_field_smaller.gif', writer='pillow', fps=30, dpi=90)
+                finally:
+                    fig.set_size_inches(original_size)
                 print("✓ Saved smaller version as 'electric_field_smaller.gif'")
                 return True
                 
@@ -213,12 +304,13 @@ if __name__ == "__main__":
     print("Using robust saving method...")
     
     # Create the animation
-    fig, anim = create_animated_field_with_components()
+    fig, stages = build_nearfield_scene()
+    anim = _scene_animation(fig, stages)
     
     print("Saving GIF with multiple fallback methods...")
     
     # Try robust saving
-    success = save_gif_robust(fig, anim, 'electric_field_1080p.gif')
+    success = save_gif_robust(fig, anim, 'electric_field_1080p.gif', stages=stages)
     
     if not success:
         print("\nTroubleshooting suggestions:")
@@ -35,6 +35,25 @@ def magnetic_field_from_dc_current_3d(x, y, z, current, conductor_x=0, conductor
     
     return Bx, By, Bz, B_magnitude
 
+def magnetic_field_from_dc_current_grid(x, y, z, current, conductor_x=0, conductor_y=0):
+    """
+    Vectorized magnetic_field_from_dc_current_3d for arrays of points, with the same
+    zero field wherever r < 1e-10. Returns arrays (Bx, By, Bz, B_magnitude)
+    """
+    dx = np.asarray(x, dtype=float) - conductor_x
+    dy = np.asarray(y, dtype=float) - conductor_y
+    r = np.sqrt(dx**2 + dy**2)
+
+    on_axis = r < 1e-10
+    r_safe = np.where(on_axis, 1.0, r)
+    B_magnitude = np.where(on_axis, 0.0, (mu_0 * current) / (2 * np.pi * r_safe))
+
+    Bx = -B_magnitude * dy / r_safe
+    By = B_magnitude * dx / r_safe
+    Bz = np.zeros_like(B_magnitude)
+
+    return Bx, By, Bz, B_magnitude
+
 def create_3d_magnetic_field_visualization():
     """
     Create 3D visualization of magnetic field around DC conductor
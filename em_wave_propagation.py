@@ -6,6 +6,51 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from mpl_toolkits.mplot3d import Axes3D
 
+from animation_pipeline import export_animation_pipelined
+from draft_preview import FULL_QUALITY
+from gif_encoder import ScenePalette
+from wave_kernels import gaussian_wave_packet
+
+def propagation_field_2d(R, t, out=None):
+    """Field of the 2D propagation scene at distance R and time t (zero outside the light cone R <= ct)"""
+    # Create a more interesting wave pattern
+    return gaussian_wave_packet(R, t, frequency=3*np.pi, width=3, out=out)
+
+def propagation_field_3d(R, t, out=None):
+    """Field of the enhanced 3D propagation scene at distance R and time t"""
+    # More complex wave pattern
+    return gaussian_wave_packet(R, t, frequency=2*np.pi, width=4, radial_frequency=np.pi/2, out=out)
+
+def compute_2d_propagation_frame(frame, n_grid=150, extent=6.0, dt=0.08):
+    """Physics stage of the 2D propagation animation: time, grid and field of one frame"""
+    t = frame * dt  # Slower time progression for smoother 60fps animation
+    
+    # 2D spatial propagation
+    x2d = np.linspace(-extent, extent, n_grid)
+    y2d = np.linspace(-extent, extent, n_grid)
+    X, Y = np.meshgrid(x2d, y2d)
+    R = np.sqrt(X**2 + Y**2)
+    
+    # Field pattern - more complex wave
+    Z = propagation_field_2d(R, t)
+    
+    return frame, t, X, Y, Z
+
+def compute_3d_propagation_frame(frame, n_grid=40, extent=5.0, dt=0.1):
+    """Physics stage of the enhanced 3D animation: time, grid and field of one frame"""
+    t = frame * dt  # Slower time progression for 60fps
+    
+    # Create spatial grid
+    x = np.linspace(-extent, extent, n_grid)
+    y = np.linspace(-extent, extent, n_grid)
+    X, Y = np.meshgrid(x, y)
+    R = np.sqrt(X**2 + Y**2)
+    
+    # Field exists only where information has arrived (R < ct)
+    Z = propagation_field_3d(R, t)
+    
+    return frame, t, X, Y, Z
+
 def show_3d_spatial_propagation_only():
     """Show only the 3D spatial propagation plot"""
     
@@ -24,11 +69,8 @@ def show_3d_spatial_propagation_only():
     t = 3
     
     # Field exists only where information has arrived (R < ct)
-    Z = np.zeros_like(R)
-    mask = R <= t  # ct with c=1
-    
-    # Inside the light cone: oscillating field
-    Z[mask] = np.sin(2*np.pi*(R[mask] - t)) * np.exp(-(R[mask] - t)**2/2)
+    # Inside the light cone (ct with c=1): oscillating field
+    Z = gaussian_wave_packet(R, t, frequency=2*np.pi, width=2)
     
     # Plot the field
     surf = ax.plot_surface(X, Y, Z, cmap='viridis', alpha=0.7)
@@ -68,9 +110,7 @@ def create_rotating_3d_static_animation(save_gif=True, filename='em_wave_3d_rota
     t = 3
     
     # Field exists only where information has arrived (R < ct)
-    Z = np.zeros_like(R)
-    mask = R <= t
-    Z[mask] = np.sin(2*np.pi*(R[mask] - t)) * np.exp(-(R[mask] - t)**2/2)
+    Z = gaussian_wave_packet(R, t, frequency=2*np.pi, width=2)
     
     def animate_rotation(frame):
         ax.clear()
@@ -133,37 +173,31 @@ def create_rotating_3d_static_animation(save_gif=True, filename='em_wave_3d_rota
     plt.show()
     return anim
 
-def create_2d_propagation_animation_with_gif(save_gif=True, filename='em_wave_2d_propagation.gif'):
-    """Create 2D propagation animation and optionally save as GIF"""
-    
-    fig, ax = plt.subplots(1, 1, figsize=(10, 8))
-    
-    def animate(frame):
+def build_2d_propagation_scene(compute_frame=None, frames=300, fps=60, dpi=100, figsize=(10, 8),
+                               cmap='RdBu_r', draft=FULL_QUALITY, n_grid=150):
+    """
+    Figure and pipeline stages of the 2D propagation animation.
+    compute_frame(frame) -> (frame, t, X, Y, Z) supplies the field, e.g. from a phased array,
+    and defaults to compute_2d_propagation_frame on an n_grid x n_grid grid; draft (see
+    draft_preview.DraftSettings) thins the frames and the grid and drops contour lines
+    """
+    compute_frame, decimate = draft.compute_stage(compute_frame, compute_2d_propagation_frame, n_grid)
+    
+    fig, ax = plt.subplots(1, 1, figsize=figsize)
+    
+    def draw_frame(state):
+        frame, t, X, Y, Z = state
+        X, Y, Z = decimate(X, Y, Z)
+        extent = np.abs(X).max()
         ax.clear()
         
-        t = frame * 0.08  # Slower time progression for smoother 60fps animation
-        
-        # 2D spatial propagation
-        x2d = np.linspace(-6, 6, 150)
-        y2d = np.linspace(-6, 6, 150)
-        X, Y = np.meshgrid(x2d, y2d)
-        R = np.sqrt(X**2 + Y**2)
-        
-        # Field pattern - more complex wave
-        Z = np.zeros_like(R)
-        mask = R <= t
-        
-        if np.any(mask) and t > 0:
-            # Create a more interesting wave pattern
-            wave_component = np.sin(3*np.pi*(R[mask] - t)) * np.exp(-(R[mask] - t)**2/3)
-            Z[mask] = wave_component
-        
         # Create contour plot with more levels for smoother appearance
         levels = np.linspace(-0.8, 0.8, 21)
-        contour = ax.contourf(X, Y, Z, levels=levels, cmap='RdBu_r', extend='both')
+        contour = ax.contourf(X, Y, Z, levels=levels, cmap=cmap, extend='both')
         
         # Add contour lines for better definition
-        ax.contour(X, Y, Z, levels=levels[::2], colors='black', alpha=0.3, linewidths=0.5)
+        if draft.contour_lines:
+            ax.contour(X, Y, Z, levels=levels[::2], colors='black', alpha=0.3, linewidths=0.5)
         
         # Wavefront circle (leading edge)
         if t > 0:
@@ -183,13 +217,13 @@ def create_2d_propagation_animation_with_gif(save_gif=True, filename='em_wave_2d
         
         # Add field strength indicators
         if t > 0:
-            ax.text(-5.5, 5, f'Time: t = {t:.2f}', fontsize=14, fontweight='bold',
+            ax.text(-extent + 0.5, extent - 1, f'Time: t = {t:.2f}', fontsize=14, fontweight='bold',
                    bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
-            ax.text(-5.5, 4.3, f'Wavefront radius: r = ct = {t:.2f}', fontsize=12,
+            ax.text(-extent + 0.5, extent - 1.7, f'Wavefront radius: r = ct = {t:.2f}', fontsize=12,
                    bbox=dict(boxstyle="round,pad=0.3", facecolor="lightblue", alpha=0.8))
         
-        ax.set_xlim([-6, 6])
-        ax.set_ylim([-6, 6])
+        ax.set_xlim([-extent, extent])
+        ax.set_ylim([-extent, extent])
         ax.set_aspect('equal')
         ax.set_xlabel('X distance', fontsize=12)
         ax.set_ylabel('Y distance', fontsize=12)
@@ -204,68 +238,85 @@ def create_2d_propagation_animation_with_gif(save_gif=True, filename='em_wave_2d
         ax.grid(True, alpha=0.3)
         ax.legend(loc='upper right')
     
-    # Create animation - more frames for 60fps
-    frames = 300  # 5 seconds at 60fps
-    anim = FuncAnimation(fig, animate, frames=frames, interval=16.67, repeat=True, blit=False)
-    
     plt.tight_layout()
     
+    stages = {
+        'compute_frame': compute_frame,
+        'draw_frame': draw_frame,
+        'frames': draft.frames(range(frames)),
+        'fps': fps,
+        'dpi': dpi,
+        'palette': ScenePalette(cmaps=[cmap], colors=['red', 'yellow', 'lightblue']),
+    }
+    return fig, stages
+
+def create_2d_propagation_animation_with_gif(save_gif=True, filename='em_wave_2d_propagation.gif',
+                                             compute_frame=compute_2d_propagation_frame,
+                                             frames=300, fps=60, dpi=100, figsize=(10, 8),
+                                             cmap='RdBu_r', show=True):
+    """
+    Create 2D propagation animation and optionally save as GIF.
+    compute_frame(frame) -> (frame, t, X, Y, Z) supplies the field, e.g. from a phased array
+    """
+    
+    fig, stages = build_2d_propagation_scene(compute_frame, frames, fps, dpi, figsize, cmap)
+    
+    def animate(frame):
+        stages['draw_frame'](compute_frame(frame))
+    
+    # Create animation - 300 frames is 5 seconds at 60fps
+    anim = FuncAnimation(fig, animate, frames=frames, interval=1000/fps, repeat=True, blit=False)
+    
     # Save as GIF if requested
     if save_gif:
         print(f"Saving animation as {filename}...")
         try:
-            # Save with 60fps
-            anim.save(filename, writer='pillow', fps=60, dpi=100, 
-                     savefig_kwargs={'bbox_inches': 'tight', 'pad_inches': 0.1})
+            # Save with 60fps, overlapping physics, drawing and GIF encoding
+            export_animation_pipelined(fig, compute_frame, stages['draw_frame'], 
+                                       stages['frames'], filename, fps=fps, dpi=dpi,
+                                       palette=stages['palette'])
             print(f"Animation saved successfully as {filename}")
         except Exception as e:
             print(f"Error saving GIF: {e}")
             print("Make sure you have Pillow installed: pip install Pillow")
     
-    plt.show()
+    if show:
+        plt.show()
     return anim
 
-def create_enhanced_3d_animation_with_gif(save_gif=True, filename='em_wave_3d_propagation.gif'):
-    """Create enhanced 3D animation and save as GIF"""
-    
-    fig = plt.figure(figsize=(12, 9))
+def build_3d_propagation_scene(compute_frame=None, frames=300, fps=60, dpi=80, figsize=(12, 9),
+                               cmap='RdYlBu_r', draft=FULL_QUALITY, n_grid=40):
+    """
+    Figure and pipeline stages of the enhanced 3D animation.
+    compute_frame(frame) -> (frame, t, X, Y, Z) supplies the field, e.g. from a phased array,
+    and defaults to compute_3d_propagation_frame on an n_grid x n_grid grid; draft (see
+    draft_preview.DraftSettings) thins the frames, the surface grid and the guide lines
+    """
+    compute_frame, decimate = draft.compute_stage(compute_frame, compute_3d_propagation_frame, n_grid)
+    
+    fig = plt.figure(figsize=figsize)
     ax = fig.add_subplot(111, projection='3d')
     
-    def animate_3d(frame):
+    def draw_frame_3d(state):
+        frame, t, X, Y, Z = state
+        X, Y, Z = decimate(X, Y, Z)
+        extent = np.abs(X).max()
         ax.clear()
         
-        t = frame * 0.1  # Slower time progression for 60fps
-        
-        # Create spatial grid
-        x = np.linspace(-5, 5, 40)
-        y = np.linspace(-5, 5, 40)
-        X, Y = np.meshgrid(x, y)
-        R = np.sqrt(X**2 + Y**2)
-        
-        # Field exists only where information has arrived (R < ct)
-        Z = np.zeros_like(R)
-        mask = R <= t
-        
-        if np.any(mask) and t > 0:
-            # More complex wave pattern
-            Z[mask] = (np.sin(2*np.pi*(R[mask] - t)) * 
-                      np.exp(-(R[mask] - t)**2/4) * 
-                      np.cos(np.pi*R[mask]/2))
-        
         # Plot the field surface
-        surf = ax.plot_surface(X, Y, Z, cmap='RdYlBu_r', alpha=0.8, 
+        surf = ax.plot_surface(X, Y, Z, cmap=cmap, alpha=0.8, 
                               linewidth=0, antialiased=True)
         
         # Show the wavefront (circle at R = ct)
         if t > 0:
-            theta = np.linspace(0, 2*np.pi, 100)
+            theta = np.linspace(0, 2*np.pi, draft.count(100, minimum=24))
             circle_x = t * np.cos(theta)
             circle_y = t * np.sin(theta)
             circle_z = np.zeros_like(theta)
             ax.plot(circle_x, circle_y, circle_z, 'r-', linewidth=4, label='Wavefront')
             
             # Add some radial lines to show propagation
-            for angle in np.linspace(0, 2*np.pi, 8, endpoint=False):
+            for angle in np.linspace(0, 2*np.pi, draft.count(8, minimum=4), endpoint=False):
                 r_line = np.linspace(0, t, 20)
                 x_line = r_line * np.cos(angle)
                 y_line = r_line * np.sin(angle)
@@ -283,8 +334,8 @@ def create_enhanced_3d_animation_with_gif(save_gif=True, filename='em_wave_3d_pr
                     fontsize=14, fontweight='bold')
         
         # Set consistent view limits
-        ax.set_xlim([-5, 5])
-        ax.set_ylim([-5, 5])
+        ax.set_xlim([-extent, extent])
+        ax.set_ylim([-extent, extent])
         ax.set_zlim([-1, 1])
         
         # Set viewing angle - slower rotation for 60fps
@@ -292,21 +343,46 @@ def create_enhanced_3d_animation_with_gif(save_gif=True, filename='em_wave_3d_pr
         
         ax.legend()
     
-    # Create animation - more frames for 60fps
-    frames = 300  # 5 seconds at 60fps
-    anim = FuncAnimation(fig, animate_3d, frames=frames, interval=16.67, repeat=True, blit=False)
+    stages = {
+        'compute_frame': compute_frame,
+        'draw_frame': draw_frame_3d,
+        'frames': draft.frames(range(frames)),
+        'fps': fps,
+        'dpi': dpi,
+        'palette': ScenePalette(cmaps=[cmap], colors=['red']),
+    }
+    return fig, stages
+
+def create_enhanced_3d_animation_with_gif(save_gif=True, filename='em_wave_3d_propagation.gif',
+                                          compute_frame=compute_3d_propagation_frame,
+                                          frames=300, fps=60, dpi=80, figsize=(12, 9),
+                                          cmap='RdYlBu_r', show=True):
+    """
+    Create enhanced 3D animation and save as GIF.
+    compute_frame(frame) -> (frame, t, X, Y, Z) supplies the field, e.g. from a phased array
+    """
+    
+    fig, stages = build_3d_propagation_scene(compute_frame, frames, fps, dpi, figsize, cmap)
+    
+    def animate_3d(frame):
+        stages['draw_frame'](compute_frame(frame))
+    
+    # Create animation - 300 frames is 5 seconds at 60fps
+    anim = FuncAnimation(fig, animate_3d, frames=frames, interval=1000/fps, repeat=True, blit=False)
     
     # Save as GIF if requested
     if save_gif:
         print(f"Saving 3D animation as {filename}...")
         try:
-            anim.save(filename, writer='pillow', fps=60, dpi=80,
-                     savefig_kwargs={'bbox_inches': 'tight', 'pad_inches': 0.1})
+            export_animation_pipelined(fig, compute_frame, stages['draw_frame'], 
+                                       stages['frames'], filename, fps=fps, dpi=dpi,
+                                       palette=stages['palette'])
             print(f"3D Animation saved successfully as {filename}")
         except Exception as e:
             print(f"Error saving 3D GIF: {e}")
     
-    plt.show()
+    if show:
+        plt.show()
     return anim
 
 if __name__ == "__main__":
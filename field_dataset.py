@@ -0,0 +1,230 @@
+"""
+Chunked, compressed on-disk datasets for full space x time field output
+"""
+
+import itertools
+import json
+import os
+import shutil
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from em_wave_propagation import propagation_field_2d
+
+METADATA_FILE = 'dataset.json'
+
+def _chunk_filename(chunk_index):
+    """File name of the chunk at (time_slab, tile_0, tile_1, ...)"""
+    return 'c.' + '.'.join(str(i) for i in chunk_index) + '.zlib'
+
+class FieldDatasetWriter:
+    """
+    Stream frames into a directory of zlib-compressed chunks.
+
+    Frames are buffered into a time-slab of time_chunk frames; each full slab is cut
+    into spatial tiles of shape tile and every (slab, tile) block is written as one
+    chunk. Only one slab is ever held in memory. Coordinates and scene parameters are
+    stored alongside in dataset.json.
+
+    Chunks are written to a sibling directory path + '.partial' that replaces path only
+    on close(), so path always holds a complete dataset (the previous one until then)
+    and is never a mix of old and new chunks. Leaving a with block on an exception
+    aborts the dataset instead.
+    """
+
+    def __init__(self, path, spatial_shape, coords=None, params=None, time_chunk=16,
+                 tile=None, dtype=np.float32, compression_level=6):
+        self.path = path
+        self.spatial_shape = tuple(spatial_shape)
+        self.coords = {name: np.asarray(values).tolist() for name, values in (coords or {}).items()}
+        self.params = dict(params or {})
+        self.time_chunk = time_chunk
+        self.tile = tuple(tile) if tile is not None else tuple(min(n, 64) for n in self.spatial_shape)
+        self.dtype = np.dtype(dtype)
+        self.compression_level = compression_level
+
+        if len(self.tile) != len(self.spatial_shape):
+            raise ValueError(f"tile {self.tile} does not match spatial shape {self.spatial_shape}")
+
+        # Chunks left behind by a writer that was killed mid-write
+        self._partial_path = os.path.normpath(path) + '.partial'
+        shutil.rmtree(self._partial_path, ignore_errors=True)
+        os.makedirs(self._partial_path)
+        self._slab = np.empty((time_chunk,) + self.spatial_shape, dtype=self.dtype)
+        self._n_buffered = 0
+        self._n_slabs = 0
+        self.times = []
+
+    def append(self, frame, t=None):
+        """Add one frame (an array of spatial_shape) recorded at time t"""
+        frame = np.asarray(frame)
+        if frame.shape != self.spatial_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match {self.spatial_shape}")
+
+        self._slab[self._n_buffered] = frame
+        self.times.append(float(t) if t is not None else float(len(self.times)))
+        self._n_buffered += 1
+
+        if self._n_buffered == self.time_chunk:
+            self._flush_slab()
+
+    def _flush_slab(self):
+        """Compress and write the buffered slab one spatial tile at a time"""
+        if self._n_buffered == 0:
+            return
+
+        n_tiles = [-(-n // size) for n, size in zip(self.spatial_shape, self.tile)]
+        for tile_index in itertools.product(*(range(n) for n in n_tiles)):
+            region = tuple(slice(i * size, (i + 1) * size) for i, size in zip(tile_index, self.tile))
+            block = np.ascontiguousarray(self._slab[(slice(0, self._n_buffered),) + region])
+
+            filename = os.path.join(self._partial_path, _chunk_filename((self._n_slabs,) + tile_index))
+            with open(filename, 'wb') as f:
+                f.write(zlib.compress(block.tobytes(), self.compression_level))
+
+        self._n_slabs += 1
+        self._n_buffered = 0
+
+    def close(self):
+        """Write any partial slab and the metadata file, then move the dataset into place"""
+        self._flush_slab()
+
+        metadata = {
+            'shape': [len(self.times)] + list(self.spatial_shape),
+            'chunks': [self.time_chunk] + list(self.tile),
+            'dtype': self.dtype.str,
+            'times': self.times,
+            'coords': self.coords,
+            'params': self.params,
+        }
+        with open(os.path.join(self._partial_path, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f)
+
+        # A directory cannot be renamed over a non-empty one, so the old dataset is moved aside first
+        previous = os.path.normpath(self.path) + '.previous'
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, previous)
+        os.replace(self._partial_path, self.path)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    def abort(self):
+        """Delete everything written so far, leaving any existing dataset at path untouched"""
+        self._n_buffered = 0
+        shutil.rmtree(self._partial_path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class FieldDataset:
+    """
+    Lazy reader for a dataset written by FieldDatasetWriter.
+
+    Indexing with integers and slices (e.g. ds[10:20, :, 75]) decompresses only
+    the chunks that overlap the selection.
+    """
+
+    def __init__(self, path, cache_size=64):
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+
+        self.shape = tuple(metadata['shape'])
+        self.chunks = tuple(metadata['chunks'])
+        self.dtype = np.dtype(metadata['dtype'])
+        self.times = np.array(metadata['times'])
+        self.coords = {name: np.array(values) for name, values in metadata['coords'].items()}
+        self.params = metadata['params']
+        self._load_chunk = lru_cache(maxsize=cache_size)(self._read_chunk)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _read_chunk(self, chunk_index):
+        """Decompress one chunk; its shape is clipped at the edges of the dataset"""
+        shape = tuple(min(size, n - i * size) for i, size, n in zip(chunk_index, self.chunks, self.shape))
+        with open(os.path.join(self.path, _chunk_filename(chunk_index)), 'rb') as f:
+            data = zlib.decompress(f.read())
+        return np.frombuffer(data, dtype=self.dtype).reshape(shape)
+
+    def _normalize_key(self, key):
+        """Expand key into one index array per dimension and the dimensions to drop"""
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (len(self.shape) - len(key) + 1) + key[i + 1:]
+        key = key + (slice(None),) * (len(self.shape) - len(key))
+        if len(key) != len(self.shape):
+            raise IndexError(f"Too many indices for dataset of shape {self.shape}")
+
+        indices, dropped = [], []
+        for dim, (k, n) in enumerate(zip(key, self.shape)):
+            if isinstance(k, slice):
+                indices.append(np.arange(*k.indices(n)))
+            else:
+                k = int(k)
+                if not -n <= k < n:
+                    raise IndexError(f"Index {k} out of range for axis {dim} with size {n}")
+                indices.append(np.array([k % n]))
+                dropped.append(dim)
+        return indices, tuple(dropped)
+
+    def __getitem__(self, key):
+        indices, dropped = self._normalize_key(key)
+        out = np.empty(tuple(len(idx) for idx in indices), dtype=self.dtype)
+
+        chunk_ids = [idx // size for idx, size in zip(indices, self.chunks)]
+        for chunk_index in itertools.product(*(np.unique(ids) for ids in chunk_ids)):
+            chunk = self._load_chunk(tuple(int(i) for i in chunk_index))
+            out_sel, chunk_sel = [], []
+            for idx, ids, i, size in zip(indices, chunk_ids, chunk_index, self.chunks):
+                in_chunk = np.nonzero(ids == i)[0]
+                out_sel.append(in_chunk)
+                chunk_sel.append(idx[in_chunk] - i * size)
+            out[np.ix_(*out_sel)] = chunk[np.ix_(*chunk_sel)]
+
+        return out.squeeze(axis=dropped) if dropped else out
+
+def open_field_dataset(path, cache_size=64):
+    """Open a field dataset for lazy, sliced reading"""
+    return FieldDataset(path, cache_size=cache_size)
+
+def export_2d_propagation_dataset(path, frames=300, n_grid=150, time_chunk=16, tile=(50, 50)):
+    """
+    Export the field of the 2D propagation scene in em_wave_propagation.py
+    (n_grid x n_grid over [-6, 6]^2, t = frame * 0.08) as a chunked dataset
+    """
+    x2d = np.linspace(-6, 6, n_grid)
+    y2d = np.linspace(-6, 6, n_grid)
+    X, Y = np.meshgrid(x2d, y2d)
+    R = np.sqrt(X**2 + Y**2)
+
+    params = {'scene': '2d_propagation', 'c': 1.0, 'dt': 0.08}
+    with FieldDatasetWriter(path, R.shape, coords={'y': y2d, 'x': x2d}, params=params,
+                            time_chunk=time_chunk, tile=tile) as writer:
+        for frame in range(frames):
+            t = frame * 0.08
+            writer.append(propagation_field_2d(R, t), t=t)
+
+    return open_field_dataset(path)
+
+if __name__ == "__main__":
+    print("Exporting 2D propagation field (150 x 150 x 300)...")
+    dataset = export_2d_propagation_dataset('em_wave_2d_propagation_field')
+    print(f"Dataset shape: {dataset.shape}, chunks: {dataset.chunks}")
+
+    # Read back a single receiver trace and one frame without loading the volume
+    trace = dataset[:, 75, 100]
+    frame = dataset[60]
+    print(f"Trace at x = {dataset.coords['x'][100]:.2f}, y = {dataset.coords['y'][75]:.2f}: "
+          f"peak {np.abs(trace).max():.3f}")
+    print(f"Frame 60 (t = {dataset.times[60]:.2f}): peak {np.abs(frame).max():.3f}")
@@ -0,0 +1,121 @@
+"""
+Streaming time-series probes for field values at fixed observation points
+"""
+
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from electric_field_propagation_nearfield import electric_field_at_point, electron_charge
+
+# Physical constants
+c = 299792458.0  # Speed of light (m/s)
+
+def oscillating_electron_field(t, x, y, y_range=0.5, omega=1.0):
+    """
+    Field of the nearfield scene's electron, which oscillates along x = 0 as
+    y = y_range * sin(omega * t). t has shape (n,), x and y have shape (p,).
+    Returns a dict of (n, p) arrays: Ex, Ey and the low-velocity Bz = (v x E)_z / c^2
+    """
+    electron_y = (y_range * np.sin(omega * t))[:, None]
+    velocity_y = (y_range * omega * np.cos(omega * t))[:, None]
+
+    Ex, Ey, _, _ = electric_field_at_point(x[None, :], y[None, :], 0.0, electron_y, electron_charge)
+
+    # Electron only moves along y, so (v x E)_z = -v_y * Ex
+    Bz = -velocity_y * Ex / c**2
+
+    return {'Ex': Ex, 'Ey': Ey, 'Bz': Bz}
+
+def probe_time_series(points, t_start, t_stop, n_samples, chunk_size=65536,
+                      field=oscillating_electron_field, **field_kwargs):
+    """
+    Yield field values at fixed observation points in chunks of at most chunk_size samples.
+
+    points is a (p, 2) array of (x, y) positions. Each chunk is a dict with 't' of shape (n,)
+    and Ex, Ey, E (= |E|) of shape (n, p), plus Bz when the field function defines it.
+    Only one chunk is resident at a time, so the series length is bounded by disk, not RAM.
+    """
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    x, y = points[:, 0], points[:, 1]
+    dt = (t_stop - t_start) / max(n_samples - 1, 1)
+
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        t = t_start + np.arange(start, stop) * dt
+
+        chunk = {'t': t}
+        chunk.update(field(t, x, y, **field_kwargs))
+        chunk['E'] = np.hypot(chunk['Ex'], chunk['Ey'])
+        yield chunk
+
+def save_probe_series(filename, points, t_start, t_stop, n_samples, chunk_size=65536,
+                      field=oscillating_electron_field, **field_kwargs):
+    """
+    Stream a probe time series to disk in constant memory.
+
+    A '.npz' filename produces one archive holding every quantity plus 'points'.
+    Any other filename is treated as a prefix and one '<prefix>_<name>.npy' file is
+    written per quantity. Returns the list of files written.
+    """
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    as_npz = filename.endswith('.npz')
+
+    if as_npz:
+        out_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(filename)))
+        prefix = os.path.join(out_dir, 'probe')
+    else:
+        prefix = filename[:-4] if filename.endswith('.npy') else filename
+
+    arrays = {}
+    try:
+        chunks = probe_time_series(points, t_start, t_stop, n_samples, chunk_size,
+                                   field, **field_kwargs)
+        start = 0
+        for chunk in chunks:
+            stop = start + len(chunk['t'])
+            for name, values in chunk.items():
+                if name not in arrays:
+                    # Memory-mapped .npy files are filled chunk by chunk
+                    shape = (n_samples,) + values.shape[1:]
+                    arrays[name] = np.lib.format.open_memmap(f'{prefix}_{name}.npy', mode='w+',
+                                                             dtype=values.dtype, shape=shape)
+                arrays[name][start:stop] = values
+            start = stop
+
+        for array in arrays.values():
+            array.flush()
+        np.save(f'{prefix}_points.npy', points)
+        names = list(arrays) + ['points']
+        arrays.clear()
+
+        if not as_npz:
+            return [f'{prefix}_{name}.npy' for name in names]
+
+        # np.load reads an .npz as a zip of .npy members, so copy the files in from disk
+        with zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name in names:
+                archive.write(f'{prefix}_{name}.npy', arcname=f'{name}.npy')
+        return [filename]
+
+    finally:
+        arrays.clear()
+        if as_npz:
+            for name in os.listdir(out_dir):
+                os.remove(os.path.join(out_dir, name))
+            os.rmdir(out_dir)
+
+if __name__ == "__main__":
+    # Receivers on a ring around the oscillating electron, including the nearfield test point
+    angles = np.linspace(0, 2*np.pi, 16, endpoint=False)
+    receivers = np.column_stack([np.cos(angles), np.sin(angles)])
+
+    print(f"Probing {len(receivers)} receivers over 1,000,000 samples...")
+    files = save_probe_series('probe_series.npz', receivers, 0.0, 4*np.pi, 1_000_000)
+
+    with np.load(files[0]) as data:
+        E = data['E']
+        print(f"Saved {', '.join(sorted(data.files))} to {files[0]}")
+        print(f"Peak |E| at test point (1.0, 0.0): {E[:, 0].max():.3e} N/C")
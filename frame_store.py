@@ -0,0 +1,103 @@
+"""
+Resumable on-disk store of rendered animation frames
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+MANIFEST_FILE = 'manifest.json'
+
+def scene_hash(params):
+    """Stable hash of a JSON-serializable dict of scene parameters"""
+    encoded = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+class FrameStore:
+    """
+    Finished frames of one export, written as lossless PNGs next to a manifest.
+
+    The manifest records the scene parameters and which output frame maps to which
+    file, and is rewritten atomically after every frame, so an export interrupted at
+    any point can resume with exactly the frames that were completed. Frames that
+    repeat an earlier one (see animation_pipeline) point at the same file.
+    """
+
+    def __init__(self, path, params=None):
+        self.path = path
+        self.params = dict(params or {})
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        self.frames = {}
+        # Dedup tokens (repr of state keys, buffer digests) of stored frames, for resumed runs
+        self.tokens = {}
+        manifest = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                data = json.load(f)
+            if data.get('scene_hash') == scene_hash(self.params):
+                # A repeat may have been recorded before its source frame reached the disk
+                self.frames = {int(i): name for i, name in data['frames'].items()
+                               if os.path.exists(os.path.join(path, name))}
+                self.tokens = {token: index for token, index in data.get('tokens', {}).items()
+                               if index in self.frames}
+
+    @classmethod
+    def for_scene(cls, root, params):
+        """Store under root in a directory named after the scene parameters"""
+        return cls(os.path.join(root, scene_hash(params)), params)
+
+    def __contains__(self, index):
+        return index in self.frames
+
+    def __len__(self):
+        return len(self.frames)
+
+    def _write_manifest(self):
+        manifest = os.path.join(self.path, MANIFEST_FILE)
+        data = {
+            'scene_hash': scene_hash(self.params),
+            'params': self.params,
+            'frames': {str(i): name for i, name in sorted(self.frames.items())},
+            'tokens': self.tokens,
+        }
+        with open(manifest + '.tmp', 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(manifest + '.tmp', manifest)
+
+    @staticmethod
+    def _name(index):
+        return f'frame_{index:06d}.png'
+
+    def put(self, index, rgba, tokens=()):
+        """Write an (h, w, 4) frame to disk, then record it and its dedup tokens as finished"""
+        name = self._name(index)
+        filename = os.path.join(self.path, name)
+        Image.fromarray(rgba, 'RGBA').save(filename + '.tmp', format='PNG', compress_level=1)
+        os.replace(filename + '.tmp', filename)
+        with self._lock:
+            self.frames[index] = name
+            for token in tokens:
+                self.tokens[token] = index
+            self._write_manifest()
+
+    def link(self, index, source_index):
+        """Record frame index as a repeat of frame source_index (which may still be in flight)"""
+        with self._lock:
+            self.frames[index] = self.frames.get(source_index, self._name(source_index))
+            self._write_manifest()
+
+    def source_of(self, index):
+        """Index of the first stored frame sharing this frame's file"""
+        name = self.frames[index]
+        return min(i for i, other in self.frames.items() if other == name)
+
+    def load(self, index):
+        """Read a stored frame back as an (h, w, 4) uint8 array"""
+        with Image.open(os.path.join(self.path, self.frames[index])) as image:
+            return np.asarray(image.convert('RGBA'))
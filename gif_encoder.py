@@ -0,0 +1,173 @@
+"""
+Global-palette, delta-frame GIF encoding for field animations
+"""
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import to_rgb
+from PIL import GifImagePlugin, Image
+
+# Palette entry reserved for "unchanged since the previous frame" in delta frames
+TRANSPARENT = 255
+
+class ScenePalette:
+    """
+    One GIF palette shared by every frame of an animation.
+
+    It holds n_colormap samples of each of the scene's colormaps, a ramp of n_grays
+    greys (text, axes, antialiasing on white) and the named colors the scene draws with.
+    fit(reference) fills the remaining entries with an adaptive palette of a reference
+    frame, for shading and blended colours no list anticipates, and precomputes a lookup
+    table from RGB (bits per channel) to the nearest entry. Frames are then mapped with a
+    single table lookup per pixel instead of being quantized one by one. Entry 255 is kept
+    free as the transparency index of delta frames.
+    """
+
+    def __init__(self, cmaps=(), colors=(), n_colormap=128, n_grays=16, bits=6):
+        self.cmaps = [colormaps[cmap] if isinstance(cmap, str) else cmap for cmap in cmaps]
+        self.colors = list(colors)
+        self.n_colormap = n_colormap
+        self.n_grays = n_grays
+        self.bits = bits
+        self.palette = None
+        self.lut = None
+
+    @property
+    def ready(self):
+        return self.lut is not None
+
+    def _base_colors(self):
+        samples = [np.array([to_rgb(color) for color in ('white', 'black') + tuple(self.colors)])]
+        samples.append(np.repeat(np.linspace(0, 1, self.n_grays)[:, None], 3, axis=1))
+        for cmap in self.cmaps:
+            samples.append(cmap(np.linspace(0, 1, self.n_colormap))[:, :3])
+        colors = np.unique(np.round(np.concatenate(samples) * 255).astype(np.uint8), axis=0)
+        if len(colors) > TRANSPARENT:
+            raise ValueError(f"Scene palette needs {len(colors)} colours; GIF frames hold {TRANSPARENT}")
+        return colors
+
+    def fit(self, reference=None):
+        """Build the palette (completed from an (h, w, 4) reference frame if given) and its lookup table"""
+        colors = self._base_colors()
+        n_free = TRANSPARENT - len(colors)
+        if reference is not None and n_free > 0:
+            adaptive = Image.fromarray(np.ascontiguousarray(reference[..., :3])).quantize(colors=n_free)
+            extra = np.array(adaptive.getpalette()[:3 * n_free], dtype=np.uint8).reshape(-1, 3)
+            colors = np.concatenate([colors, extra])
+
+        self.palette = np.zeros((256, 3), dtype=np.uint8)
+        self.palette[:len(colors)] = colors
+        self.lut = self._lookup_table(colors)
+        return self
+
+    def _lookup_table(self, colors, chunk=1 << 14):
+        """Nearest palette entry for the centre of every RGB bin"""
+        levels = 1 << self.bits
+        shift = 8 - self.bits
+        centers = (np.arange(levels) << shift) + (1 << shift >> 1)
+        palette = colors.astype(np.float64)
+        norms = (palette**2).sum(axis=1)
+        lut = np.empty(levels**3, dtype=np.uint8)
+        for start in range(0, levels**3, chunk):
+            index = np.arange(start, min(start + chunk, levels**3))
+            rgb = np.stack([centers[index >> 2 * self.bits], centers[(index >> self.bits) & (levels - 1)],
+                            centers[index & (levels - 1)]], axis=1).astype(np.float64)
+            # |rgb - c|^2 without the |rgb|^2 term, which is the same for every entry
+            lut[start:start + len(index)] = (norms - 2 * rgb @ palette.T).argmin(axis=1)
+        # Colours that are in the palette map to themselves
+        lut[self._bins(colors)] = np.arange(len(colors))
+        return lut
+
+    def _bins(self, rgb):
+        shift = 8 - self.bits
+        rgb = np.asarray(rgb, dtype=np.uint32) >> shift
+        return rgb[..., 0] << 2 * self.bits | rgb[..., 1] << self.bits | rgb[..., 2]
+
+    def map(self, rgba):
+        """Palette indices (h, w) of an (h, w, 3|4) uint8 frame"""
+        if not self.ready:
+            raise RuntimeError("ScenePalette.fit() must be called before mapping frames")
+        return self.lut[self._bins(rgba[..., :3])]
+
+class DeltaGifWriter:
+    """
+    Write palette-index frames (see ScenePalette.map) as a GIF with one global colour table.
+
+    The first frame is stored whole. Every later frame stores only the bounding box of
+    the pixels that changed, drawn over the previous frame (disposal 1) with unchanged
+    pixels inside the box set to the transparency index, which LZW compresses to almost
+    nothing. Frames identical to the previous one just extend its duration.
+    """
+
+    def __init__(self, filename, palette, loop=0):
+        self.filename = filename
+        self.palette = palette
+        self.loop = loop
+        self._file = None
+        self._previous = None
+        self._pending = None
+
+    def _write_header(self, shape):
+        height, width = shape
+        self._file = open(self.filename, 'wb')
+        # Logical screen with a 256-entry global colour table, then the looping extension
+        self._file.write(b'GIF89a' + width.to_bytes(2, 'little') + height.to_bytes(2, 'little') +
+                         bytes([0xF7, 0, 0]) + self.palette.palette.tobytes())
+        self._file.write(b'!\xff\x0bNETSCAPE2.0\x03\x01' + self.loop.to_bytes(2, 'little') + b'\x00')
+
+    def _flush(self):
+        if self._pending is None:
+            return
+        indices, offset, duration, transparent = self._pending
+        params = {'duration': duration, 'disposal': 1}
+        if transparent:
+            params['transparency'] = TRANSPARENT
+        # Mode 'L' so Pillow's GIF encoder writes the indices as they are
+        for chunk in GifImagePlugin.getdata(Image.fromarray(indices), offset, **params):
+            self._file.write(chunk)
+        self._pending = None
+
+    def add(self, indices, duration):
+        """Append a frame of palette indices shown for duration milliseconds"""
+        if self._previous is None:
+            self._write_header(indices.shape)
+            self._pending = (np.ascontiguousarray(indices), (0, 0), duration, False)
+            self._previous = indices.copy()
+            return
+        if indices.shape != self._previous.shape:
+            raise ValueError(f"Frame shape {indices.shape} does not match {self._previous.shape}")
+
+        changed = indices != self._previous
+        rows = np.flatnonzero(changed.any(axis=1))
+        if rows.size == 0:
+            self._pending = self._pending[:2] + (self._pending[2] + duration,) + self._pending[3:]
+            return
+        cols = np.flatnonzero(changed.any(axis=0))
+        box = np.s_[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+        delta = indices[box].copy()
+        delta[~changed[box]] = TRANSPARENT
+        self._flush()
+        self._pending = (delta, (int(cols[0]), int(rows[0])), duration, True)
+        self._previous[box] = indices[box]
+
+    def close(self):
+        if self._file is None:
+            return
+        self._flush()
+        self._file.write(b';')
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def write_delta_gif(filename, frames, durations, palette, loop=0):
+    """Write an iterable of palette-index frames with per-frame durations (ms) as a delta GIF"""
+    with DeltaGifWriter(filename, palette, loop) as writer:
+        for indices, duration in zip(frames, durations):
+            writer.add(indices, duration)
+    return filename
@@ -0,0 +1,406 @@
+"""
+Real-time interactive viewer with background prefetching and frame-budget scheduling
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.patches import Circle, FancyArrowPatch
+from matplotlib.widgets import Button, Slider
+
+from electric_field_propagation_nearfield import electric_field_at_point, electron_charge
+from em_fields_of_dc_current import magnetic_field_from_dc_current_grid
+from wave_kernels import gaussian_wave_packet
+
+class FramePrefetcher:
+    """
+    Background thread computing the scene state the display will need next.
+
+    The viewer posts a request (time, parameters, resolution) every tick; only the newest
+    request is kept, so the worker never falls behind on stale frames. latest() returns
+    the most recently finished (request, state, compute seconds) without blocking.
+    """
+
+    def __init__(self, compute):
+        self._compute = compute
+        self._condition = threading.Condition()
+        self._request = None
+        self._result = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, t, params, resolution):
+        with self._condition:
+            self._request = (t, dict(params), resolution)
+            self._condition.notify()
+
+    def latest(self):
+        with self._condition:
+            return self._result
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._request is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                request, self._request = self._request, None
+
+            start = time.perf_counter()
+            state = self._compute(*request)
+            elapsed = time.perf_counter() - start
+            with self._condition:
+                self._result = (request, state, elapsed)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+class ViewerScene:
+    """
+    A scene the viewer can play. Subclasses set the class attributes and implement
+    setup(ax) -> list of dynamic artists, compute(t, params, resolution) -> state (runs on
+    the prefetch thread, so it must not touch matplotlib) and update(state), which only
+    changes the data of the dynamic artists.
+    """
+
+    title = ''
+    # (name, label, min, max, initial) of each live parameter slider
+    sliders = ()
+    # Resolutions from finest to coarsest; the viewer steps through them to hold its frame rate
+    resolutions = (None,)
+    # Simulation time per second of playback, and the time after which playback wraps (None: never)
+    time_rate = 1.0
+    duration = None
+    animated = True
+
+class PropagationScene(ViewerScene):
+    """2D propagation scene drawn as an image, so a frame only replaces its pixel data"""
+
+    title = 'Electromagnetic Wave Propagation'
+    sliders = (('frequency', 'Source frequency', 0.5, 3.0, 1.5),
+               ('width', 'Packet width', 1.0, 8.0, 3.0))
+    resolutions = (400, 300, 200, 150, 100, 64)
+    time_rate = 4.8  # 0.08 per frame at 60fps, as in the exported animation
+    duration = 24.0
+
+    def __init__(self, extent=6.0):
+        self.extent = extent
+        self._radius = {}
+
+    def _radius_grid(self, n):
+        # Grids are cached per resolution, so switching levels does not recompute them
+        if n not in self._radius:
+            x = np.linspace(-self.extent, self.extent, n)
+            X, Y = np.meshgrid(x, x)
+            self._radius[n] = np.sqrt(X**2 + Y**2)
+        return self._radius[n]
+
+    def compute(self, t, params, n):
+        Z = gaussian_wave_packet(self._radius_grid(n), t, 2 * np.pi * params['frequency'], params['width'])
+        return t, Z
+
+    def setup(self, ax):
+        extent = self.extent
+        self.image = ax.imshow(np.zeros((2, 2)), extent=(-extent, extent, -extent, extent),
+                               origin='lower', cmap='RdBu_r', vmin=-0.8, vmax=0.8,
+                               interpolation='bilinear')
+        plt.colorbar(self.image, ax=ax, shrink=0.8).set_label('Field Strength', fontsize=12)
+        self.wavefront = Circle((0, 0), 0, fill=False, color='red', linewidth=3)
+        ax.add_patch(self.wavefront)
+        ax.scatter([0], [0], color='yellow', s=200, zorder=5, edgecolors='black', linewidth=2)
+        self.time_text = ax.text(-extent + 0.5, extent - 1, '', fontsize=14, fontweight='bold',
+                                 bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
+        ax.set_xlim([-extent, extent])
+        ax.set_ylim([-extent, extent])
+        ax.set_xlabel('X distance', fontsize=12)
+        ax.set_ylabel('Y distance', fontsize=12)
+        return [self.image, self.wavefront, self.time_text]
+
+    def update(self, state):
+        t, Z = state
+        self.image.set_data(Z)
+        self.wavefront.set_radius(max(t, 0))
+        self.time_text.set_text(f'Time: t = {t:.2f}')
+
+class NearfieldScene(ViewerScene):
+    """Oscillating electron and the field components it produces at a fixed test point"""
+
+    title = 'Electric Field of an Oscillating Electron'
+    sliders = (('frequency', 'Oscillation frequency', 0.1, 3.0, 1.0),
+               ('amplitude', 'Amplitude (m)', 0.1, 0.7, 0.5))
+    time_rate = 2.0
+    duration = 8 * np.pi
+
+    def __init__(self, test_point=(1.0, 0.0), scale_factor=2e8):
+        self.test_x, self.test_y = test_point
+        self.scale_factor = scale_factor
+
+    def compute(self, t, params, resolution):
+        electron_y = params['amplitude'] * np.sin(params['frequency'] * t)
+        Ex, Ey, E_magnitude, distance = electric_field_at_point(self.test_x, self.test_y, 0.0,
+                                                                electron_y, electron_charge)
+        return electron_y, Ex, Ey, E_magnitude, distance
+
+    def setup(self, ax):
+        tx, ty = self.test_x, self.test_y
+        ax.add_patch(Circle((tx, ty), 0.01, color='blue', zorder=5))
+        self.electron = Circle((0, 0), 0.02, color='red', zorder=4)
+        ax.add_patch(self.electron)
+        self.distance_line, = ax.plot([], [], 'k--', alpha=0.6, linewidth=1)
+        self.arrows = [FancyArrowPatch((tx, ty), (tx, ty), arrowstyle='->', mutation_scale=20,
+                                       color=color, linewidth=width, alpha=alpha, zorder=3)
+                       for color, width, alpha in (('red', 3, 0.4), ('blue', 3, 1.0), ('green', 2, 0.3))]
+        for arrow in self.arrows:
+            ax.add_patch(arrow)
+        self.info = ax.text(0.98, 0.98, '', transform=ax.transAxes, fontsize=10, va='top', ha='right',
+                            bbox=dict(boxstyle="round,pad=0.3", facecolor="lightgreen"))
+        ax.set_xlim(-0.3, 1.8)
+        ax.set_ylim(-0.8, 0.8)
+        ax.set_aspect('equal')
+        ax.grid(True, alpha=0.3)
+        ax.set_xlabel('Distance (m)', fontsize=12)
+        ax.set_ylabel('Distance (m)', fontsize=12)
+        return [self.electron, self.distance_line, *self.arrows, self.info]
+
+    def update(self, state):
+        electron_y, Ex, Ey, E_magnitude, distance = state
+        tx, ty = self.test_x, self.test_y
+        end_x, end_y = tx + Ex * self.scale_factor, ty + Ey * self.scale_factor
+
+        self.electron.center = (0.0, electron_y)
+        self.distance_line.set_data([0.0, tx], [electron_y, ty])
+        self.arrows[0].set_positions((tx, ty), (end_x, ty))
+        self.arrows[1].set_positions((tx, ty), (tx, end_y))
+        self.arrows[2].set_positions((tx, ty), (end_x, end_y))
+        self.info.set_text(f'Ex = {Ex:.2e} N/C\nEy = {Ey:.2e} N/C\nTotal = {E_magnitude:.2e} N/C\n'
+                           f'Distance: {distance:.4f} m')
+
+class DCCurrentScene(ViewerScene):
+    """Cross-section of the magnetic field around the DC conductor; redrawn only when the current changes"""
+
+    title = 'Magnetic Field of a DC Conductor (cross-section)'
+    sliders = (('current', 'Current (A)', -20.0, 20.0, 10.0),)
+    resolutions = (400, 250, 150, 80)
+    animated = False
+
+    def __init__(self, extent=2.0, n_arrows=15):
+        self.extent = extent
+        q = np.linspace(-extent, extent, n_arrows)
+        self.Xq, self.Yq = np.meshgrid(q, q)
+
+    def compute(self, t, params, n):
+        x = np.linspace(-self.extent, self.extent, n)
+        X, Y = np.meshgrid(x, x)
+        _, _, _, B = magnetic_field_from_dc_current_grid(X, Y, 0.0, params['current'])
+        Bx, By, _, Bq = magnetic_field_from_dc_current_grid(self.Xq, self.Yq, 0.0, params['current'])
+        # Arrows show direction; the background shows strength (B is signed with the current)
+        Bq = np.where(Bq != 0, np.abs(Bq), 1.0)
+        return np.log10(np.maximum(np.abs(B), 1e-12)), Bx / Bq, By / Bq
+
+    def setup(self, ax):
+        extent = self.extent
+        self.image = ax.imshow(np.zeros((2, 2)), extent=(-extent, extent, -extent, extent),
+                               origin='lower', cmap='magma', interpolation='bilinear')
+        plt.colorbar(self.image, ax=ax, shrink=0.8).set_label('log10 |B| (T)', fontsize=12)
+        self.arrows = ax.quiver(self.Xq, self.Yq, np.zeros_like(self.Xq), np.zeros_like(self.Yq),
+                                color='white', alpha=0.8, pivot='middle', scale=20)
+        ax.scatter([0], [0], color='orange', s=150, edgecolors='black', zorder=5)
+        ax.set_xlabel('X (m)', fontsize=12)
+        ax.set_ylabel('Y (m)', fontsize=12)
+        return [self.image, self.arrows]
+
+    def update(self, state):
+        log_B, U, V = state
+        self.image.set_data(log_B)
+        finite = log_B[log_B > -12]
+        if finite.size:
+            self.image.set_clim(finite.min(), finite.max())
+        self.arrows.set_UVC(U, V)
+
+class InteractiveViewer:
+    """
+    Play a ViewerScene at a target frame rate.
+
+    Playback is time-based: every tick shows the scene at the current playback time, so
+    frames are skipped rather than the animation slowing down. States are computed ahead
+    on a FramePrefetcher thread, only the scene's dynamic artists are redrawn (blitted
+    over a cached background where the backend supports it), and the grid resolution
+    steps down when frames miss the budget and back up when there is headroom.
+    """
+
+    def __init__(self, scene, target_fps=60, figsize=(10, 9)):
+        self.scene = scene
+        self.target_fps = target_fps
+        self.budget = 1.0 / target_fps
+        self.level = 0
+        self.t = 0.0
+        self.playing = scene.animated
+        self.params = {name: initial for name, _, _, _, initial in scene.sliders}
+
+        self.fig = plt.figure(figsize=figsize)
+        n_controls = len(scene.sliders) + (2 if scene.animated else 0)
+        bottom = 0.06 + 0.045 * n_controls
+        self.ax = self.fig.add_axes([0.1, bottom + 0.05, 0.8, 0.9 - bottom])
+        self.ax.set_title(scene.title, fontsize=14, fontweight='bold')
+        self.dynamic = scene.setup(self.ax)
+        self.status = self.fig.text(0.01, 0.01, '', fontsize=9, color='gray')
+        self.dynamic.append(self.status)
+
+        self.sliders = {}
+        row = 0
+        for name, label, low, high, initial in scene.sliders:
+            self.sliders[name] = self._add_slider(row, label, low, high, initial, self._on_param)
+            row += 1
+        if scene.animated:
+            self.speed = self._add_slider(row, 'Speed', 0.0, 4.0, 1.0, None)
+            self.time_slider = self._add_slider(row + 1, 'Time', 0.0, scene.duration or 100.0, 0.0,
+                                                self._on_time)
+            self.play_button = Button(self.fig.add_axes([0.86, 0.01, 0.1, 0.04]), 'Pause')
+            self.play_button.on_clicked(self._toggle)
+
+        self.blit = self.fig.canvas.supports_blit
+        if self.blit and scene.animated:
+            # The moving time slider is blitted with the scene instead of redrawing the figure
+            self.time_slider.drawon = False
+            self.dynamic.append(self.time_slider.ax)
+        for artist in self.dynamic:
+            artist.set_animated(self.blit)
+        self._background = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+        self.prefetcher = FramePrefetcher(scene.compute)
+        self._shown = None
+        self._dirty = True
+        self._last_tick = time.perf_counter()
+        self._last_slider_sync = 0.0
+        self._frame_times = []
+        self._level_changed = self._last_tick
+        self._syncing = False
+
+        self.timer = self.fig.canvas.new_timer(interval=max(int(1000 / target_fps), 1))
+        self.timer.add_callback(self.tick)
+
+    def _add_slider(self, row, label, low, high, initial, callback):
+        ax = self.fig.add_axes([0.2, 0.06 + 0.045 * row, 0.6, 0.03])
+        slider = Slider(ax, label, low, high, valinit=initial)
+        if callback is not None:
+            slider.on_changed(callback)
+        return slider
+
+    def _on_param(self, _):
+        self.params = {name: slider.val for name, slider in self.sliders.items()}
+        self._dirty = True
+
+    def _on_time(self, value):
+        if not self._syncing:
+            self.t = value
+            self._dirty = True
+
+    def _toggle(self, _):
+        self.playing = not self.playing
+        self.play_button.label.set_text('Pause' if self.playing else 'Play')
+
+    def _on_draw(self, _):
+        # A full redraw (resize, slider move) invalidates the cached background
+        if self.blit:
+            self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+            self._draw_dynamic()
+
+    def _draw_dynamic(self):
+        for artist in self.dynamic:
+            self.fig.draw_artist(artist)
+        self.fig.canvas.blit(self.fig.bbox)
+
+    @property
+    def resolution(self):
+        return self.scene.resolutions[self.level]
+
+    def _adapt(self, frame_seconds, compute_seconds):
+        """Step the resolution down on missed budgets and up after a second of headroom"""
+        self._frame_times = (self._frame_times + [max(frame_seconds, compute_seconds)])[-30:]
+        now = time.perf_counter()
+        if len(self._frame_times) < 10 or now - self._level_changed < 0.5:
+            return
+        typical = float(np.median(self._frame_times))
+        coarsest = len(self.scene.resolutions) - 1
+        if typical > self.budget and self.level < coarsest:
+            self.level += 1
+        elif typical < 0.5 * self.budget and self.level > 0 and now - self._level_changed > 1.0:
+            self.level -= 1
+        else:
+            return
+        self._level_changed = now
+        self._frame_times = []
+        self._dirty = True
+
+    def tick(self):
+        """Advance playback time, request the next state and draw the newest finished one"""
+        now = time.perf_counter()
+        if self.playing:
+            self.t += (now - self._last_tick) * self.scene.time_rate * self.speed.val
+            if self.scene.duration:
+                self.t %= self.scene.duration
+        self._last_tick = now
+
+        if self.playing or self._dirty:
+            # Ask for the time the frame will be shown at, one compute latency from now
+            latest = self.prefetcher.latest()
+            latency = latest[2] if latest else 0.0
+            ahead = latency * self.scene.time_rate * self.speed.val if self.playing else 0.0
+            self.prefetcher.request(self.t + ahead, self.params, self.resolution)
+            self._dirty = False
+
+        latest = self.prefetcher.latest()
+        if latest is None or latest is self._shown:
+            return
+        request, state, compute_seconds = latest
+        self._shown = latest
+
+        start = time.perf_counter()
+        self.scene.update(state)
+        fps = 1.0 / max(np.median(self._frame_times), 1e-6) if self._frame_times else 0.0
+        self.status.set_text(f'{min(fps, self.target_fps):.0f} fps target {self.target_fps}, '
+                             f'resolution {request[2] or "-"}')
+        if self.blit and self._background is not None:
+            self.fig.canvas.restore_region(self._background)
+            self._draw_dynamic()
+        else:
+            self.fig.canvas.draw_idle()
+        self._adapt(time.perf_counter() - start, compute_seconds)
+
+        # Move the time slider a few times a second
+        if self.scene.animated and now - self._last_slider_sync > 0.25:
+            self._syncing = True
+            self.time_slider.set_val(request[0] % (self.scene.duration or 100.0))
+            self._syncing = False
+            self._last_slider_sync = now
+
+    def show(self):
+        self.timer.start()
+        try:
+            plt.show()
+        finally:
+            self.timer.stop()
+            self.prefetcher.close()
+
+SCENES = {
+    'propagation': PropagationScene,
+    'nearfield': NearfieldScene,
+    'dc_current': DCCurrentScene,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interactive real-time field viewer")
+    parser.add_argument('scene', choices=sorted(SCENES))
+    parser.add_argument('--fps', type=int, default=60, help="Target frame rate")
+    args = parser.parse_args()
+
+    InteractiveViewer(SCENES[args.scene](), target_fps=args.fps).show()
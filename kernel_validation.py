@@ -0,0 +1,332 @@
+"""
+Accuracy-versus-speed validation of fast field kernels against their reference formulas
+"""
+
+import atexit
+import time
+
+import numpy as np
+
+from electric_field_propagation_nearfield import electric_field_at_point, electron_charge
+from em_fields_of_dc_current import magnetic_field_from_dc_current_3d, magnetic_field_from_dc_current_grid
+from em_wave_propagation import propagation_field_2d
+from field_probe import c, oscillating_electron_field
+from parallel_grid import ParallelGridEvaluator
+from poisson_solver import PoissonSolver, gaussian_charge_cloud
+from radiation_pattern import ArrayPattern, direction_vectors
+from wave_kernels import BACKENDS, gaussian_wave_packet
+
+class KernelCheck:
+    """
+    A fast kernel, the reference it must reproduce and the inputs to compare them on.
+
+    reference(*args) and candidate(*args) return an array or a tuple of arrays. cases
+    maps a case name to a function rng -> args, so each case can be randomized or
+    adversarial (singular points, grid boundaries, huge grids). The candidate passes
+    when non-finite values (inf/nan) appear in the same places as in the reference and
+    max |candidate - reference| <= atol + rtol * max |reference| over the finite values.
+
+    setup(*args), if given, turns a case's args into the candidate's args once per case,
+    outside the timed runs (e.g. copying inputs into shared memory), and teardown(*args)
+    releases whatever setup acquired.
+    """
+
+    def __init__(self, name, reference, candidate, cases, rtol=1e-12, atol=0.0, setup=None, teardown=None):
+        self.name = name
+        self.reference = reference
+        self.candidate = candidate
+        self.cases = cases
+        self.rtol = rtol
+        self.atol = atol
+        self.setup = setup
+        self.teardown = teardown
+
+# Checks run by validate_kernels(); fast paths add theirs with register_check()
+KERNEL_CHECKS = []
+
+def register_check(check):
+    KERNEL_CHECKS.append(check)
+    return check
+
+def _flatten(result):
+    if not isinstance(result, tuple):
+        result = (result,)
+    return np.concatenate([np.ravel(np.asarray(part, dtype=complex if np.iscomplexobj(part) else float))
+                           for part in result])
+
+def _best_time(func, args, repeats):
+    """Result of func(*args) and its best wall time over repeats runs"""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def run_check(check, repeats=3, seed=0):
+    """Compare a check's candidate to its reference on every case; one report dict per case"""
+    reports = []
+    for case_name, make_args in check.cases.items():
+        args = make_args(np.random.default_rng(seed))
+        # Adversarial inputs hit divisions by zero on purpose
+        with np.errstate(all='ignore'):
+            expected, reference_time = _best_time(check.reference, args, repeats)
+            candidate_args = check.setup(*args) if check.setup is not None else args
+            try:
+                actual, candidate_time = _best_time(check.candidate, candidate_args, repeats)
+            finally:
+                if check.teardown is not None:
+                    check.teardown(*candidate_args)
+            expected, actual = _flatten(expected), _flatten(actual)
+
+            if expected.shape != actual.shape:
+                raise ValueError(f"{check.name}/{case_name}: candidate returned {actual.size} "
+                                 f"values, reference {expected.size}")
+
+            finite = np.isfinite(expected) & np.isfinite(actual)
+            nonfinite_mismatches = int(np.sum(np.isfinite(expected) != np.isfinite(actual)) +
+                                       np.sum(~np.isfinite(expected) & ~np.isfinite(actual) &
+                                              (np.isnan(expected) != np.isnan(actual))))
+            error = np.abs(actual[finite] - expected[finite])
+            scale = np.abs(expected[finite]).max(initial=0.0)
+
+        max_error = error.max(initial=0.0)
+        reports.append({
+            'kernel': check.name,
+            'case': case_name,
+            'points': expected.size,
+            'max_abs_error': float(max_error),
+            'rms_error': float(np.sqrt(np.mean(error**2))) if error.size else 0.0,
+            'max_rel_error': float(max_error / scale) if scale > 0 else float(max_error),
+            'nonfinite_mismatches': nonfinite_mismatches,
+            'reference_time': reference_time,
+            'candidate_time': candidate_time,
+            'speedup': reference_time / max(candidate_time, 1e-12),
+            'passed': nonfinite_mismatches == 0 and max_error <= check.atol + check.rtol * scale,
+        })
+    return reports
+
+def validate_kernels(checks=None, repeats=3, seed=0, verbose=True):
+    """Run every check (default: all registered ones) and print a table of errors and speedups"""
+    reports = []
+    for check in (KERNEL_CHECKS if checks is None else checks):
+        for report in run_check(check, repeats, seed):
+            reports.append(report)
+            if verbose:
+                status = 'ok' if report['passed'] else 'FAILED'
+                print(f"{report['kernel']:<28} {report['case']:<22} {report['points']:>10} "
+                      f"{report['max_abs_error']:>10.2e} {report['rms_error']:>10.2e} "
+                      f"{report['max_rel_error']:>10.2e} {report['speedup']:>8.1f}x  {status}")
+    return reports
+
+# --- Nearfield scene: vectorized probe field vs. per-sample electric_field_at_point ---
+
+def _nearfield_reference(t, x, y, y_range=0.5, omega=1.0):
+    Ex, Ey, Bz = (np.empty((len(t), len(x))) for _ in range(3))
+    for i, ti in enumerate(t):
+        electron_y = y_range * np.sin(omega * ti)
+        velocity_y = y_range * omega * np.cos(omega * ti)
+        for j in range(len(x)):
+            Ex[i, j], Ey[i, j], _, _ = electric_field_at_point(x[j], y[j], 0.0, electron_y, electron_charge)
+            Bz[i, j] = -velocity_y * Ex[i, j] / c**2
+    return Ex, Ey, Bz
+
+def _nearfield_candidate(t, x, y):
+    fields = oscillating_electron_field(t, x, y)
+    return fields['Ex'], fields['Ey'], fields['Bz']
+
+def _points_on_trajectory(rng, offset):
+    """Probe points on (or offset from) the electron's path at the sampled times"""
+    t = rng.uniform(0, 4 * np.pi, 64)
+    x = np.full(16, offset)
+    y = 0.5 * np.sin(t[:16])
+    return t, x, y
+
+register_check(KernelCheck(
+    'nearfield_probe_field', _nearfield_reference, _nearfield_candidate, rtol=1e-12, cases={
+        'random': lambda rng: (rng.uniform(0, 20, 500), rng.uniform(-3, 3, 64), rng.uniform(-3, 3, 64)),
+        'on_charge (r = 0)': lambda rng: _points_on_trajectory(rng, 0.0),
+        'near_charge (r < 1e-10)': lambda rng: _points_on_trajectory(rng, 1e-11),
+        'far (r ~ 1e6)': lambda rng: (rng.uniform(0, 20, 200), rng.uniform(-1e6, 1e6, 64),
+                                      rng.uniform(-1e6, 1e6, 64)),
+    }))
+
+# --- DC conductor: vectorized grid field vs. per-point magnetic_field_from_dc_current_3d ---
+
+def _dc_reference(x, y, z, current):
+    return tuple(np.array(values, dtype=float) for values in
+                 zip(*(magnetic_field_from_dc_current_3d(*point, current) for point in zip(x, y, z))))
+
+def _dc_candidate(x, y, z, current):
+    return magnetic_field_from_dc_current_grid(x, y, z, current)
+
+def _dc_points(rng, n, radius_scale):
+    r = radius_scale * rng.uniform(0.5, 2.0, n)
+    angle = rng.uniform(0, 2 * np.pi, n)
+    return r * np.cos(angle), r * np.sin(angle), rng.uniform(-2, 2, n), 10.0
+
+register_check(KernelCheck(
+    'dc_current_field', _dc_reference, _dc_candidate, rtol=1e-12, cases={
+        'random': lambda rng: _dc_points(rng, 20000, 1.0),
+        'on_axis (r < 1e-10)': lambda rng: _dc_points(rng, 2000, 5e-11),
+        'at_cutoff (r ~ 1e-10)': lambda rng: _dc_points(rng, 2000, 1e-10),
+        'large_grid': lambda rng: _dc_points(rng, 200000, 1.0),
+    }))
+
+# --- Point charge: FFT Poisson solution of a smeared charge vs. the analytic -r/r^3 grid ---
+
+def _point_charge_grid(n, extent=2.0):
+    x = np.linspace(-extent, extent, n)
+    X, Y, Z = np.meshgrid(x, x, x, indexing='ij')
+    return x, X, Y, Z, np.sqrt(X**2 + Y**2 + Z**2)
+
+def _point_charge_reference(n, sigma, min_radius):
+    _, X, Y, Z, r = _point_charge_grid(n)
+    outside = r > min_radius
+    return tuple((-A / r**3)[outside] for A in (X, Y, Z))
+
+def _point_charge_candidate(n, sigma, min_radius):
+    x, X, Y, Z, r = _point_charge_grid(n)
+    _, Ex, Ey, Ez = PoissonSolver.for_grid(x, x, x).solve(gaussian_charge_cloud(X, Y, Z, -1.0, sigma))
+    outside = r > min_radius
+    return Ex[outside], Ey[outside], Ez[outside]
+
+register_check(KernelCheck(
+    'poisson_point_charge', _point_charge_reference, _point_charge_candidate, rtol=2e-2, cases={
+        'grid_64': lambda rng: (64, 0.1, 0.6),
+        'grid_128': lambda rng: (128, 0.05, 0.4),
+        'huge_grid_192': lambda rng: (192, 0.04, 0.3),
+    }))
+
+# --- Propagation scenes: fused wave kernels and parallel evaluation vs. the masked expressions ---
+
+def _propagation_2d_reference(R, t):
+    Z = np.zeros_like(R)
+    mask = R <= t
+    if np.any(mask) and t > 0:
+        Z[mask] = np.sin(3*np.pi*(R[mask] - t)) * np.exp(-(R[mask] - t)**2/3)
+    return Z
+
+def _propagation_3d_reference(R, t):
+    Z = np.zeros_like(R)
+    mask = R <= t
+    if np.any(mask) and t > 0:
+        Z[mask] = (np.sin(2*np.pi*(R[mask] - t)) *
+                   np.exp(-(R[mask] - t)**2/4) *
+                   np.cos(np.pi*R[mask]/2))
+    return Z
+
+_evaluator = None
+
+def _parallel_evaluator():
+    global _evaluator
+    if _evaluator is None:
+        _evaluator = ParallelGridEvaluator()
+        atexit.register(_evaluator.close)
+    return _evaluator
+
+def _propagation_2d_parallel(shared_R, t):
+    return _parallel_evaluator().evaluate(propagation_field_2d, shared_R, t=t).copy()
+
+def _radius_grid(n, extent=6.0):
+    x = np.linspace(-extent, extent, n)
+    X, Y = np.meshgrid(x, x)
+    return np.sqrt(X**2 + Y**2)
+
+_propagation_cases = {
+    'random': lambda rng: (rng.uniform(0, 6, (300, 300)), rng.uniform(0, 6)),
+    'before_emission (t = 0)': lambda rng: (_radius_grid(300), 0.0),
+    'on_light_cone (R = t)': lambda rng: (np.full((500, 500), 3.0), 3.0),
+    'partly_emitted': lambda rng: (_radius_grid(1000), 1.0),
+    'huge_grid': lambda rng: (_radius_grid(3000), 5.0),
+}
+
+for _backend in BACKENDS:
+    register_check(KernelCheck(
+        f'wave_packet_2d[{_backend}]', _propagation_2d_reference,
+        lambda R, t, backend=_backend: gaussian_wave_packet(R, t, 3*np.pi, 3, backend=backend),
+        rtol=1e-12, cases=_propagation_cases))
+    register_check(KernelCheck(
+        f'wave_packet_3d[{_backend}]', _propagation_3d_reference,
+        lambda R, t, backend=_backend: gaussian_wave_packet(R, t, 2*np.pi, 4, np.pi/2, backend=backend),
+        rtol=1e-12, cases=_propagation_cases))
+
+register_check(KernelCheck(
+    'propagation_2d_parallel', _propagation_2d_reference, _propagation_2d_parallel, rtol=1e-12,
+    cases=_propagation_cases,
+    # R is copied into shared memory once per case, like a scene's grid across its frames
+    setup=lambda R, t: (_parallel_evaluator().share(R), t),
+    teardown=lambda shared_R, t: _parallel_evaluator().release(shared_R)))
+
+# --- Lattice array factor: padded FFT with cubic interpolation vs. the direct sum ---
+
+def _lattice_steered(nx, ny, theta0, phi0):
+    lattice = ArrayPattern.from_lattice(nx, ny, n_theta=2, n_phi=2)
+    weights = np.exp(1j * lattice.k * lattice.positions @ direction_vectors(theta0, phi0))
+    return lattice, weights
+
+def _lattice_reference(nx, ny, theta0, phi0, directions):
+    lattice, weights = _lattice_steered(nx, ny, theta0, phi0)
+    return lattice._direct_array_factor(directions, weights)
+
+def _lattice_candidate(nx, ny, theta0, phi0, directions):
+    lattice, weights = _lattice_steered(nx, ny, theta0, phi0)
+    return lattice.array_factor(directions, weights)
+
+def _sphere_directions(rng, n):
+    return direction_vectors(np.arccos(rng.uniform(-1, 1, n)), rng.uniform(0, 2 * np.pi, n))
+
+def _grazing_directions(n):
+    """Directions in the lattice plane, where u or v reaches +-1 and the FFT bins wrap around"""
+    return direction_vectors(np.full(n, np.pi / 2), np.linspace(0, 2 * np.pi, n))
+
+register_check(KernelCheck(
+    'lattice_array_factor', _lattice_reference, _lattice_candidate, rtol=2e-4, cases={
+        'odd_5x3_broadside': lambda rng: (5, 3, 0.0, 0.0, _sphere_directions(rng, 20000)),
+        'even_8x6_steered': lambda rng: (8, 6, np.radians(30), 0.3, _sphere_directions(rng, 20000)),
+        'grazing (|u| = 1)': lambda rng: (8, 6, np.radians(80), 1.0, _grazing_directions(20000)),
+        'large_64x64': lambda rng: (64, 64, np.radians(45), 2.0, _sphere_directions(rng, 20000)),
+    }))
+
+# --- Beam metrics: uniform arrays vs. the closed-form array factor sin(N psi / 2) / (N sin(psi / 2)) ---
+
+def _uniform_beam_reference(n, steer_deg, planar, plane, cut_theta_deg):
+    # With half-wavelength spacing psi = pi * (sin(theta) - sin(theta0)); the half-power
+    # point and first sidelobe (-13.26 dB as n grows) are read off a dense psi grid. The
+    # azimuth cut of a lattice steered in the xz-plane crosses its y factor at broadside
+    psi = np.linspace(1e-9, np.pi, 1 << 20)
+    power = (np.sin(n * psi / 2) / (n * np.sin(psi / 2)))**2
+    half = psi[np.argmax(power < 0.5)] / np.pi
+    sidelobe = 10 * np.log10(power[psi > 2 * np.pi / n].max())
+    s0 = np.sin(np.radians(steer_deg if plane == 'elevation' else 0.0))
+    return np.array([np.degrees(np.arcsin(s0 + half) - np.arcsin(s0 - half)), sidelobe])
+
+def _uniform_beam_candidate(n, steer_deg, planar, plane, cut_theta_deg):
+    if planar:
+        array = ArrayPattern.from_lattice(n, n)
+    else:
+        array = ArrayPattern(np.column_stack([(np.arange(n) - (n - 1) / 2) * 0.5, np.zeros(n)]))
+    weights = np.exp(1j * array.k * array.positions @ direction_vectors(np.radians(steer_deg), 0.0))
+    return np.array(array._beam_metrics(*array._cut(weights, np.radians(cut_theta_deg), 0.0, plane)))
+
+register_check(KernelCheck(
+    'uniform_array_beam_metrics', _uniform_beam_reference, _uniform_beam_candidate, rtol=0.0, atol=0.02,
+    cases={
+        'ula_64_broadside': lambda rng: (64, 0.0, False, 'elevation', 0.0),
+        'ula_16_steered_30': lambda rng: (16, 30.0, False, 'elevation', 30.0),
+        # Cut through the nearest theta sample, half a degree off the beam peak
+        'lattice_32_off_peak_cut': lambda rng: (32, 30.4, True, 'elevation', 30.0),
+        'lattice_32_azimuth_cut': lambda rng: (32, 30.0, True, 'azimuth', 30.0),
+        # Peak at the pole, where a cone of constant theta collapses to a point
+        'lattice_16_pole_azimuth': lambda rng: (16, 0.0, True, 'azimuth', 0.0),
+    }))
+
+if __name__ == "__main__":
+    print(f"{'kernel':<28} {'case':<22} {'values':>10} {'max abs':>10} {'rms':>10} "
+          f"{'max rel':>10} {'speedup':>9}")
+    reports = validate_kernels()
+    failures = [report for report in reports if not report['passed']]
+    if failures:
+        print(f"\n{len(failures)} of {len(reports)} cases broke their declared tolerance")
+        raise SystemExit(1)
+    print(f"\nAll {len(reports)} cases within tolerance")
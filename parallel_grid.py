@@ -0,0 +1,191 @@
+"""
+Shared-memory parallel evaluation of field formulas over large grids
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import time
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from em_wave_propagation import propagation_field_2d
+
+# Reused output buffers attached by this worker process, by name
+_attached = {}
+
+def _open_block(name):
+    """Attach to an existing shared memory block without taking ownership of it"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    block = shared_memory.SharedMemory(name=name)
+    # Only the parent owns (and unlinks) the block
+    resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+def _attach(name):
+    """Attach to a shared memory block in a worker, keeping the handle for later frames"""
+    if name not in _attached:
+        _attached[name] = _open_block(name)
+    return _attached[name]
+
+def _fill_tile(func, blocks, inputs, out_block, output, start, stop, kwargs):
+    """Compute one tile into the output block; the array views die when this returns"""
+    args = [np.ndarray(shape, dtype=dtype, buffer=block.buf).reshape(-1)[start:stop]
+            for block, (_, shape, dtype) in zip(blocks, inputs)]
+    _, shape, dtype = output
+    out = np.ndarray(shape, dtype=dtype, buffer=out_block.buf).reshape(-1)
+    out[start:stop] = func(*args, **kwargs)
+
+def _evaluate_tile(func, inputs, output, keep_output, start, stop, kwargs):
+    """
+    Worker task: evaluate func on one flat tile, writing straight into the shared output.
+    Inputs are mapped only for the duration of the task, so released grids are not kept
+    alive by the workers; the output stays attached when keep_output is set (the
+    evaluator's own reused buffers)
+    """
+    blocks = [_open_block(name) for name, _, _ in inputs]
+    out_block = _attach(output[0]) if keep_output else _open_block(output[0])
+    try:
+        _fill_tile(func, blocks, inputs, out_block, output, start, stop, kwargs)
+    except BaseException as e:
+        # The traceback holds the array views; a block cannot be closed while they exist
+        traceback.clear_frames(e.__traceback__)
+        raise
+    finally:
+        if not keep_output:
+            blocks.append(out_block)
+        for block in blocks:
+            block.close()
+
+class SharedArray:
+    """A NumPy array backed by a multiprocessing.shared_memory block"""
+
+    def __init__(self, shape, dtype=np.float64):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        self.block = shared_memory.SharedMemory(create=True, size=size)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.block.buf)
+
+    @property
+    def spec(self):
+        """Picklable (name, shape, dtype) description sent to workers instead of the data"""
+        return self.block.name, self.shape, self.dtype.str
+
+    def close(self):
+        self.array = None
+        self.block.close()
+        self.block.unlink()
+
+class ParallelGridEvaluator:
+    """
+    Evaluate element-wise field formulas over large grids on a persistent worker pool.
+
+    Input grids are copied once into shared memory with share() and can be reused for
+    every frame; evaluate() splits the flattened grid into tiles and each worker writes
+    its tile directly into a shared output buffer, so no arrays are pickled. func must be
+    a module-level function that works on 1D slices, e.g. propagation_field_2d.
+    """
+
+    def __init__(self, n_workers=None, tile_size=1 << 18, min_parallel_size=1 << 16):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.tile_size = tile_size
+        self.min_parallel_size = min_parallel_size
+        self._pool = mp.get_context().Pool(self.n_workers)
+        self._outputs = {}
+        self._shared = []
+
+    def share(self, array):
+        """Copy an input grid into shared memory, returning a SharedArray for evaluate()"""
+        shared = SharedArray(np.shape(array), np.asarray(array).dtype)
+        shared.array[...] = array
+        self._shared.append(shared)
+        return shared
+
+    def release(self, shared):
+        """
+        Free the shared memory of an input grid returned by share(). Workers map inputs
+        only while evaluating a tile, so this releases the memory in every process
+        """
+        self._shared.remove(shared)
+        shared.close()
+
+    def _output_for(self, shape, dtype):
+        """Reuse one shared output buffer per (shape, dtype) across frames"""
+        key = (tuple(shape), np.dtype(dtype).str)
+        if key not in self._outputs:
+            self._outputs[key] = SharedArray(shape, dtype)
+        return self._outputs[key]
+
+    def evaluate(self, func, *grids, dtype=np.float64, out=None, **kwargs):
+        """
+        Evaluate func(*grids, **kwargs) tile by tile in parallel.
+
+        grids are SharedArrays of the same shape (see share()). The result is written to
+        out (a SharedArray) or to a reused internal buffer; the returned array is a view
+        of that buffer, so copy it if it must survive the next call with the same shape.
+        """
+        shape = grids[0].shape
+        if any(grid.shape != shape for grid in grids):
+            raise ValueError("All input grids must have the same shape")
+
+        output = out if out is not None else self._output_for(shape, dtype)
+        size = int(np.prod(shape))
+
+        if size < self.min_parallel_size:
+            # Not worth the dispatch overhead
+            output.array[...] = func(*(grid.array for grid in grids), **kwargs)
+            return output.array
+
+        inputs = [grid.spec for grid in grids]
+        n_tiles = max(-(-size // self.tile_size), self.n_workers)
+        bounds = np.linspace(0, size, n_tiles + 1).astype(int)
+        keep_output = output in self._outputs.values()
+        tasks = [(func, inputs, output.spec, keep_output, start, stop, kwargs)
+                 for start, stop in zip(bounds[:-1], bounds[1:])]
+        self._pool.starmap(_evaluate_tile, tasks, chunksize=1)
+
+        return output.array
+
+    def close(self):
+        """Stop the worker pool and release all shared memory"""
+        self._pool.close()
+        self._pool.join()
+        for shared in self._shared + list(self._outputs.values()):
+            shared.close()
+        self._shared = []
+        self._outputs = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+if __name__ == "__main__":
+    n = 4000
+    print(f"Evaluating the 2D propagation field on a {n} x {n} grid ({n*n:.1e} points)...")
+
+    x2d = np.linspace(-6, 6, n)
+    X, Y = np.meshgrid(x2d, x2d)
+    R = np.sqrt(X**2 + Y**2)
+
+    start = time.perf_counter()
+    Z_serial = propagation_field_2d(R, 3.0)
+    serial_time = time.perf_counter() - start
+
+    with ParallelGridEvaluator() as evaluator:
+        R_shared = evaluator.share(R)
+        evaluator.evaluate(propagation_field_2d, R_shared, t=3.0)  # Warm up the pool
+
+        start = time.perf_counter()
+        Z_parallel = evaluator.evaluate(propagation_field_2d, R_shared, t=3.0)
+        parallel_time = time.perf_counter() - start
+
+        print(f"Serial:   {serial_time:.3f} s")
+        print(f"Parallel: {parallel_time:.3f} s on {evaluator.n_workers} workers "
+              f"({serial_time / parallel_time:.1f}x)")
+        print(f"Max difference: {np.abs(Z_serial - Z_parallel).max():.2e}")
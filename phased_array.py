@@ -0,0 +1,174 @@
+"""
+Phased-array superposition of many emitters on a fixed observation grid
+"""
+
+import time
+
+import numpy as np
+
+from em_wave_propagation import (create_2d_propagation_animation_with_gif,
+                                 create_enhanced_3d_animation_with_gif)
+
+class PhasedArray:
+    """
+    N continuous-wave emitters, each with its own position, amplitude, phase offset and
+    turn-on time, superposed on a fixed grid (c = 1 units as in em_wave_propagation.py).
+
+    Emitter n contributes a_n * sin(k*R_n - omega*(t - t_n) + phi_n) inside its own light
+    cone R_n <= c*(t - t_n). The per-emitter distance table R_n and phase table
+    exp(j*k*R_n) are computed once, so changing amplitudes or phases (beam steering) only
+    costs one complex matrix-vector product. All (emitters x grid) work is done in chunks
+    of at most chunk_size elements.
+    """
+
+    def __init__(self, positions, grid, wavelength=1.0, c=1.0, amplitudes=None, phases=None,
+                 turn_on_times=None, chunk_size=1 << 22, normalize=True):
+        self.positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        n_emitters, n_dims = self.positions.shape
+
+        # grid is a tuple of coordinate arrays (X, Y) or (X, Y, Z) of the same shape
+        self.grid = tuple(np.asarray(g, dtype=float) for g in grid)
+        if len(self.grid) != n_dims:
+            raise ValueError(f"{n_dims}D emitter positions need {n_dims} grid coordinate arrays")
+        self.grid_shape = self.grid[0].shape
+        points = np.stack([g.ravel() for g in self.grid], axis=1)
+
+        self.wavelength = wavelength
+        self.c = c
+        self.k = 2 * np.pi / wavelength
+        self.omega = self.k * c
+        self.chunk_size = chunk_size
+        self.normalize = normalize
+
+        self.amplitudes = np.ones(n_emitters) if amplitudes is None else np.asarray(amplitudes, dtype=float)
+        self.phases = np.zeros(n_emitters) if phases is None else np.asarray(phases, dtype=float)
+        self.turn_on_times = np.zeros(n_emitters) if turn_on_times is None else np.asarray(turn_on_times, dtype=float)
+
+        # Geometry tables, built chunk by chunk over the grid
+        n_points = len(points)
+        self.distances = np.empty((n_emitters, n_points))
+        self.phase_table = np.empty((n_emitters, n_points), dtype=complex)
+        for sl in self._point_chunks():
+            diff = points[None, sl, :] - self.positions[:, None, :]
+            self.distances[:, sl] = np.sqrt(np.einsum('npd,npd->np', diff, diff))
+            np.exp(1j * self.k * self.distances[:, sl], out=self.phase_table[:, sl])
+
+        # Time at which each emitter's light cone covers the whole grid
+        self._full_coverage = self.turn_on_times + self.distances.max(axis=1, initial=0) / c
+        self._steady = None
+
+    def _point_chunks(self):
+        """Slices over grid points keeping (emitters x chunk) within chunk_size elements"""
+        n_emitters, n_points = len(self.positions), self.grid[0].size
+        step = max(1, self.chunk_size // n_emitters)
+        for start in range(0, n_points, step):
+            yield slice(start, min(start + step, n_points))
+
+    @property
+    def weights(self):
+        """Complex excitation a_n * exp(j*phi_n), normalized to unit total amplitude if requested"""
+        weights = self.amplitudes * np.exp(1j * self.phases)
+        if self.normalize:
+            weights = weights / max(np.abs(self.amplitudes).sum(), 1e-300)
+        return weights
+
+    def set_excitation(self, amplitudes=None, phases=None):
+        """Update amplitudes and/or phases without touching the cached geometry"""
+        if amplitudes is not None:
+            self.amplitudes = np.asarray(amplitudes, dtype=float)
+        if phases is not None:
+            self.phases = np.asarray(phases, dtype=float)
+        self._steady = None
+
+    def steer(self, direction):
+        """
+        Point the main beam along direction: an angle in degrees from +x (2D arrays)
+        or a 3D vector. Sets phi_n = k * (u . r_n) for the unit vector u.
+        """
+        if np.ndim(direction) == 0:
+            angle = np.radians(direction)
+            u = np.array([np.cos(angle), np.sin(angle), 0.0])[:self.positions.shape[1]]
+        else:
+            u = np.asarray(direction, dtype=float)
+            u = u / np.linalg.norm(u)
+        self.set_excitation(phases=self.k * self.positions @ u)
+
+    def steady_state_phasor(self):
+        """
+        Complex field sum_n w_n exp(j*(k*R_n + omega*t_n)) once every emitter illuminates
+        the whole grid; the real field is then Im(phasor * exp(-j*omega*t))
+        """
+        if self._steady is None:
+            self._steady = np.empty(self.distances.shape[1], dtype=complex)
+            weights = self.weights * np.exp(1j * self.omega * self.turn_on_times)
+            for sl in self._point_chunks():
+                self._steady[sl] = weights @ self.phase_table[:, sl]
+        return self._steady
+
+    def field(self, t):
+        """Superposed real field on the grid at time t"""
+        if t >= self._full_coverage.max():
+            # Every light-cone mask is all-true: a single cached phasor times exp(-j*omega*t)
+            return (self.steady_state_phasor() * np.exp(-1j * self.omega * t)).imag.reshape(self.grid_shape)
+
+        out = np.zeros(self.distances.shape[1])
+        on = t > self.turn_on_times
+        if not np.any(on):
+            return out.reshape(self.grid_shape)
+
+        elapsed = t - self.turn_on_times[on]
+        coefficients = self.weights[on] * np.exp(-1j * self.omega * elapsed)
+        radius = (self.c * elapsed)[:, None]
+        for sl in self._point_chunks():
+            inside = self.distances[on, sl] <= radius
+            out[sl] = (coefficients @ np.where(inside, self.phase_table[on, sl], 0)).imag
+        return out.reshape(self.grid_shape)
+
+    def compute_frame_function(self, dt):
+        """compute_frame(frame) -> (frame, t, X, Y, Z) for the renderers in em_wave_propagation.py"""
+        X, Y = self.grid[0], self.grid[1]
+
+        def compute_frame(frame):
+            t = frame * dt
+            return frame, t, X, Y, self.field(t)
+
+        return compute_frame
+
+def uniform_linear_array(n_elements, spacing=0.5, wavelength=1.0, axis=1):
+    """Positions of n_elements spaced by spacing*wavelength along x (axis=0) or y (axis=1), centered on the origin"""
+    positions = np.zeros((n_elements, 2))
+    positions[:, axis] = (np.arange(n_elements) - (n_elements - 1) / 2) * spacing * wavelength
+    return positions
+
+if __name__ == "__main__":
+    # 64-element half-wavelength array along y, observed on the 2D propagation scene grid
+    x2d = np.linspace(-6, 6, 150)
+    y2d = np.linspace(-6, 6, 150)
+    X, Y = np.meshgrid(x2d, y2d)
+
+    print("Building 64-element phased array distance tables...")
+    start = time.perf_counter()
+    array = PhasedArray(uniform_linear_array(64, wavelength=0.5), (X, Y), wavelength=0.5)
+    print(f"Geometry cached in {time.perf_counter() - start:.3f} s")
+
+    angles = np.linspace(-60, 60, 121)
+    start = time.perf_counter()
+    for angle in angles:
+        array.steer(angle)
+        array.field(100.0)
+    elapsed = time.perf_counter() - start
+    print(f"Beam-steering sweep: {len(angles)} angles in {elapsed:.3f} s "
+          f"({1000 * elapsed / len(angles):.2f} ms per steered field)")
+
+    # Steer 30 degrees and render the switch-on with the existing 2D and 3D renderers
+    array.steer(30)
+    print("\nRendering steered array with the 2D propagation renderer...")
+    create_2d_propagation_animation_with_gif(save_gif=True, filename='phased_array_2d_propagation.gif',
+                                             compute_frame=array.compute_frame_function(0.08))
+
+    X3, Y3 = np.meshgrid(np.linspace(-5, 5, 40), np.linspace(-5, 5, 40))
+    array_3d = PhasedArray(uniform_linear_array(16, wavelength=1.0), (X3, Y3), wavelength=1.0)
+    array_3d.steer(30)
+    print("\nRendering steered array with the enhanced 3D renderer...")
+    create_enhanced_3d_animation_with_gif(save_gif=True, filename='phased_array_3d_propagation.gif',
+                                          compute_frame=array_3d.compute_frame_function(0.1))
@@ -6,30 +6,18 @@ import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.animation as animation
 
-# Create 3D grid (avoiding the origin)
-x, y, z = np.meshgrid(np.linspace(-2, 2, 8), 
-                      np.linspace(-2, 2, 8), 
-                      np.linspace(-2, 2, 8))
-
-# Remove points too close to origin
-mask = np.sqrt(x**2 + y**2 + z**2) > 0.3
-x, y, z = x[mask], y[mask], z[mask]
-
-# Calculate field components
-r = np.sqrt(x**2 + y**2 + z**2)
-Ex, Ey, Ez = -x/r**3, -y/r**3, -z/r**3
-
-# Create figure
-fig = plt.figure(figsize=(12, 9))
-ax = fig.add_subplot(111, projection='3d')
+from animation_pipeline import export_animation_pipelined
+from draft_preview import FULL_QUALITY
+from frame_store import FrameStore
+from gif_encoder import ScenePalette
 
 # Function to create field lines
-def create_field_lines():
+def create_field_lines(n_theta=6, n_phi=8):
     field_lines = []
     
     # Create field lines from different starting points
-    angles_theta = np.linspace(0, np.pi, 6)  # 6 lines in theta direction
-    angles_phi = np.linspace(0, 2*np.pi, 8)  # 8 lines in phi direction
+    angles_theta = np.linspace(0, np.pi, n_theta)  # 6 lines in theta direction
+    angles_phi = np.linspace(0, 2*np.pi, n_phi)  # 8 lines in phi direction
     
     for theta in angles_theta:
         for phi in angles_phi:
@@ -80,62 +68,105 @@ def create_field_lines():
     
     return field_lines
 
-# Generate field lines once
-field_lines = create_field_lines()
+def build_field_rotation_scene(draft=FULL_QUALITY, grid_points=8, dpi=150):
+    """
+    Figure and pipeline stages of the rotating point-charge scene.
+    draft (see draft_preview.DraftSettings) thins the frames, the arrow grid and the field lines
+    """
+    n = draft.count(grid_points, minimum=3)
 
-# Animation function with varying elevation and azimuth + selective axes removal
-def animate(frame):
-    ax.clear()
-    
-    # Plot faint continuous field lines FIRST (so arrows appear on top)
-    for line_x, line_y, line_z in field_lines:
-        ax.plot(line_x, line_y, line_z, color='lightblue', alpha=0.3, linewidth=0.8)
-    
-    # Plot field vectors with shorter length (0.1) ON TOP
-    ax.quiver(x, y, z, Ex, Ey, Ez, length=0.1, color='blue', alpha=0.7)
-    
-    # Plot charge
-    ax.scatter([0], [0], [0], color='red', s=200)
-    
-    # METHOD 2 ROTATION: Varying elevation and azimuth
-    elev = 20 + 10 * np.sin(frame * 0.1)  # Varying elevation
-    azim = frame * 2  # Rotating azimuth
-    ax.view_init(elev=elev, azim=azim)
-    
-    # METHOD 2 AXES REMOVAL: Selective removal with more control
-    ax.set_xticks([])  # Remove x-axis ticks
-    ax.set_yticks([])  # Remove y-axis ticks
-    ax.set_zticks([])  # Remove z-axis ticks
-    
-    # Remove axis labels
-    ax.set_xlabel('')
-    ax.set_ylabel('')
-    ax.set_zlabel('')
-    
-    # Remove axis lines and panes
-    ax.xaxis.pane.fill = False
-    ax.yaxis.pane.fill = False
-    ax.zaxis.pane.fill = False
-    
-    # Make pane edges invisible
-    ax.xaxis.pane.set_edgecolor('w')
-    ax.yaxis.pane.set_edgecolor('w')
-    ax.zaxis.pane.set_edgecolor('w')
-    
-    # Remove grid
-    ax.grid(False)
-    
-    # Keep consistent axis limits (invisible)
-    ax.set_xlim([-2, 2])
-    ax.set_ylim([-2, 2])
-    ax.set_zlim([-2, 2])
+    # Create 3D grid (avoiding the origin)
+    x, y, z = np.meshgrid(np.linspace(-2, 2, n), 
+                          np.linspace(-2, 2, n), 
+                          np.linspace(-2, 2, n))
+
+    # Remove points too close to origin
+    mask = np.sqrt(x**2 + y**2 + z**2) > 0.3
+    x, y, z = x[mask], y[mask], z[mask]
+
+    # Calculate field components
+    r = np.sqrt(x**2 + y**2 + z**2)
+    Ex, Ey, Ez = -x/r**3, -y/r**3, -z/r**3
+
+    # Create figure
+    fig = plt.figure(figsize=(12, 9))
+    ax = fig.add_subplot(111, projection='3d')
+
+    # Generate field lines once
+    field_lines = create_field_lines(draft.count(6, minimum=3), draft.count(8, minimum=4))
+
+    # Animation function with varying elevation and azimuth + selective axes removal
+    def animate(frame):
+        ax.clear()
+
+        # Plot faint continuous field lines FIRST (so arrows appear on top)
+        for line_x, line_y, line_z in field_lines:
+            ax.plot(line_x, line_y, line_z, color='lightblue', alpha=0.3, linewidth=0.8)
+
+        # Plot field vectors with shorter length (0.1) ON TOP
+        ax.quiver(x, y, z, Ex, Ey, Ez, length=0.1, color='blue', alpha=0.7)
+
+        # Plot charge
+        ax.scatter([0], [0], [0], color='red', s=200)
+
+        # METHOD 2 ROTATION: Varying elevation and azimuth
+        elev = 20 + 10 * np.sin(frame * 0.1)  # Varying elevation
+        azim = frame * 2  # Rotating azimuth
+        ax.view_init(elev=elev, azim=azim)
+
+        # METHOD 2 AXES REMOVAL: Selective removal with more control
+        ax.set_xticks([])  # Remove x-axis ticks
+        ax.set_yticks([])  # Remove y-axis ticks
+        ax.set_zticks([])  # Remove z-axis ticks
+
+        # Remove axis labels
+        ax.set_xlabel('')
+        ax.set_ylabel('')
+        ax.set_zlabel('')
+
+        # Remove axis lines and panes
+        ax.xaxis.pane.fill = False
+        ax.yaxis.pane.fill = False
+        ax.zaxis.pane.fill = False
+
+        # Make pane edges invisible
+        ax.xaxis.pane.set_edgecolor('w')
+        ax.yaxis.pane.set_edgecolor('w')
+        ax.zaxis.pane.set_edgecolor('w')
+
+        # Remove grid
+        ax.grid(False)
+
+        # Keep consistent axis limits (invisible)
+        ax.set_xlim([-2, 2])
+        ax.set_ylim([-2, 2])
+        ax.set_zlim([-2, 2])
+
+    stages = {
+        'compute_frame': lambda frame: frame,
+        'draw_frame': animate,
+        'frames': draft.frames(np.arange(0, 360, 1)),
+        'fps': 60,
+        'dpi': dpi,
+        'palette': ScenePalette(colors=['lightblue', 'blue', 'red']),
+        # Everything that changes the rendered frames, used to key resumable frame stores
+        'params': {'scene': 'electric_field_rotation_pro', 'frames': 360, 'dpi': dpi,
+                   'figsize': [12, 9], 'grid_points': grid_points},
+    }
+    return fig, stages
+
+if __name__ == "__main__":
+    fig, stages = build_field_rotation_scene()
 
-# Create animation
-ani = animation.FuncAnimation(fig, animate, frames=np.arange(0, 360, 1),
-                            interval=100, repeat=True)
+    # Create animation
+    ani = animation.FuncAnimation(fig, stages['draw_frame'], frames=stages['frames'],
+                                interval=100, repeat=True)
 
-# Save animation as professional quality GIF with 60 fps
-ani.save('electric_field_rotation_pro.gif', writer='pillow', fps=60, dpi=150,
-         savefig_kwargs={'bbox_inches': 'tight', 'pad_inches': 0.1})
+    # Save animation as professional quality GIF with 60 fps, checkpointing finished frames
+    # so an interrupted export resumes where it stopped instead of starting over
+    export_animation_pipelined(fig, stages['compute_frame'], stages['draw_frame'], stages['frames'],
+                               'electric_field_rotation_pro.gif', fps=stages['fps'], dpi=stages['dpi'],
+                               frame_store=FrameStore.for_scene('frames', stages['params']),
+                               palette=stages['palette'])
 
-plt.show()
+    plt.show()
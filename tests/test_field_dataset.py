@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pytest
+
+from field_dataset import METADATA_FILE, FieldDatasetWriter, open_field_dataset
+
+def _write(path, n_frames, offset=0.0, fail_after=None):
+    with FieldDatasetWriter(path, (8, 8), time_chunk=2, tile=(4, 4)) as writer:
+        for i in range(n_frames):
+            if i == fail_after:
+                raise RuntimeError("simulated crash")
+            writer.append(np.full((8, 8), offset + i), t=i)
+
+def test_aborted_rewrite_keeps_previous_dataset(tmp_path):
+    path = str(tmp_path / 'dataset')
+    _write(path, 6)
+    with pytest.raises(RuntimeError):
+        _write(path, 6, offset=100.0, fail_after=3)
+
+    dataset = open_field_dataset(path)
+    assert dataset.shape == (6, 8, 8)
+    assert [dataset[i].mean() for i in range(6)] == [0, 1, 2, 3, 4, 5]
+    assert not os.path.exists(path + '.partial')
+
+def test_killed_rewrite_leaves_previous_dataset_intact(tmp_path):
+    path = str(tmp_path / 'dataset')
+    _write(path, 6)
+
+    # A writer that never reaches close() or abort(), as after a hard kill
+    writer = FieldDatasetWriter(path, (8, 8), time_chunk=2, tile=(4, 4))
+    for i in range(4):
+        writer.append(np.full((8, 8), 100.0 + i))
+
+    assert open_field_dataset(path)[0].mean() == 0
+    _write(path, 3, offset=10.0)
+    dataset = open_field_dataset(path)
+    assert dataset.shape == (3, 8, 8)
+    assert [dataset[i].mean() for i in range(3)] == [10, 11, 12]
+
+def test_aborted_first_write_leaves_no_dataset(tmp_path):
+    path = str(tmp_path / 'dataset')
+    with pytest.raises(RuntimeError):
+        _write(path, 6, fail_after=3)
+    assert not os.path.exists(os.path.join(path, METADATA_FILE))
+    assert os.listdir(tmp_path) == []
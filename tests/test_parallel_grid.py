@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+from em_wave_propagation import propagation_field_2d
+from parallel_grid import ParallelGridEvaluator
+
+def _worker_mappings(evaluator):
+    """Lines of every worker's /proc/<pid>/maps"""
+    lines = []
+    for process in evaluator._pool._pool:
+        with open(f'/proc/{process.pid}/maps') as f:
+            lines.extend(f.read().splitlines())
+    return lines
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason="needs /proc/<pid>/maps")
+def test_release_unmaps_inputs_in_workers():
+    with ParallelGridEvaluator(n_workers=2, tile_size=1 << 16) as evaluator:
+        names = []
+        for t in range(5):
+            R = np.random.default_rng(t).uniform(0, 6, (1000, 1000))  # 8 MB
+            shared = evaluator.share(R)
+            names.append(shared.block.name.lstrip('/'))
+            result = evaluator.evaluate(propagation_field_2d, shared, t=3.0)
+            np.testing.assert_array_equal(result, propagation_field_2d(R, 3.0))
+            evaluator.release(shared)
+
+        mapped = [line for line in _worker_mappings(evaluator) if any(name in line for name in names)]
+        assert mapped == []
+
+def test_worker_error_propagates_and_releases():
+    with ParallelGridEvaluator(n_workers=2, tile_size=1 << 16) as evaluator:
+        shared = evaluator.share(np.ones((400, 400)))
+        with pytest.raises(TypeError):
+            evaluator.evaluate(propagation_field_2d, shared, not_an_argument=1.0)
+        evaluator.release(shared)
+        assert evaluator._shared == []
@@ -0,0 +1,324 @@
+"""
+Multi-resolution tile pyramids of 2D field maps for zoomable inspection
+"""
+
+import collections
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from em_wave_propagation import propagation_field_2d
+from phased_array import PhasedArray, uniform_linear_array
+
+METADATA_FILE = 'pyramid.json'
+
+def _tile_filename(level, i, j):
+    """File name of tile (row i, column j) of a pyramid level"""
+    return f't.{level}.{i}.{j}.zlib'
+
+def _level_shapes(shape, tile_size):
+    """Shape of every level, halving from full resolution until one tile covers the map"""
+    shapes = [tuple(shape)]
+    while max(shapes[-1]) > tile_size:
+        shapes.append(tuple(-(-n // 2) for n in shapes[-1]))
+    return shapes
+
+def _tile_shape(level_shape, tile_size, i, j):
+    """Shape of tile (i, j), clipped at the edges of its level"""
+    return min(tile_size, level_shape[0] - i * tile_size), min(tile_size, level_shape[1] - j * tile_size)
+
+def _tile_grid(level_shape, tile_size):
+    """Number of tile rows and columns of a level"""
+    return tuple(-(-n // tile_size) for n in level_shape)
+
+def _morton_key(index):
+    """Z-order position of tile (i, j), so the four children of a parent are finished together"""
+    i, j = index
+    key = 0
+    for bit in range(32):
+        key |= ((i >> bit) & 1) << (2 * bit + 1) | ((j >> bit) & 1) << (2 * bit)
+    return key
+
+def _downsample(tile):
+    """2 x 2 block mean, repeating the last row/column of odd-sized tiles"""
+    pad = [(0, n % 2) for n in tile.shape]
+    if any(after for _, after in pad):
+        tile = np.pad(tile, pad, mode='edge')
+    ny, nx = tile.shape
+    return tile.reshape(ny // 2, 2, nx // 2, 2).mean(axis=(1, 3)).astype(tile.dtype)
+
+def _write_tile(path, level, i, j, tile, compression_level):
+    with open(os.path.join(path, _tile_filename(level, i, j)), 'wb') as f:
+        f.write(zlib.compress(np.ascontiguousarray(tile).tobytes(), compression_level))
+
+def _render_tile(task):
+    """
+    Worker task: evaluate the field on one full-resolution tile, write it and return
+    its downsampled half for the next level with the tile's value range
+    """
+    field, params, (i, j), x, y, path, dtype, compression_level = task
+    X, Y = np.meshgrid(x, y)
+    tile = np.asarray(field(X, Y, **params), dtype=dtype)
+    _write_tile(path, 0, i, j, tile, compression_level)
+    finite = tile[np.isfinite(tile)]
+    value_range = (float(finite.min()), float(finite.max())) if finite.size else (np.inf, -np.inf)
+    return (i, j), _downsample(tile), value_range
+
+def _ordered_results(executor, function, tasks, window):
+    """
+    function(task) for every task, in order, with at most window tasks submitted ahead
+    of the one being consumed, so a map of millions of tiles holds a bounded number of
+    pending tasks and finished tiles
+    """
+    in_flight = collections.deque()
+    for task in tasks:
+        in_flight.append(executor.submit(function, task))
+        if len(in_flight) == window:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+def export_tile_pyramid(path, field, x_range, y_range, shape, params=None, tile_size=256,
+                        n_workers=None, dtype=np.float32, compression_level=6):
+    """
+    Evaluate field(X, Y, **params) on a shape = (ny, nx) sample grid spanning x_range and
+    y_range (endpoints included, as np.linspace) and write it as a tile pyramid.
+
+    Level 0 holds the full-resolution samples and each further level halves the previous
+    one by 2 x 2 block means, up to a single tile. Every level is cut into tile_size x
+    tile_size tiles (row i covers increasing y) stored as zlib-compressed chunks, with the
+    layout in pyramid.json. Level-0 tiles are evaluated lazily in parallel, each worker
+    building only its own tile's coordinates, and coarser tiles are assembled from their
+    children as soon as all four are done, so the full map is never held in memory. field
+    must be a module-level function (it is sent to worker processes).
+    """
+    if tile_size % 2:
+        raise ValueError(f"tile_size must be even, got {tile_size}")
+
+    shapes = _level_shapes(shape, tile_size)
+    n_levels = len(shapes)
+    half = tile_size // 2
+    os.makedirs(path, exist_ok=True)
+
+    x = np.linspace(*x_range, shape[1])
+    y = np.linspace(*y_range, shape[0])
+    rows, cols = _tile_grid(shapes[0], tile_size)
+    indices = sorted(((i, j) for i in range(rows) for j in range(cols)), key=_morton_key)
+    tasks = ((field, dict(params or {}), (i, j), x[j * tile_size:(j + 1) * tile_size],
+              y[i * tile_size:(i + 1) * tile_size], path, np.dtype(dtype).str, compression_level)
+             for i, j in indices)
+
+    # Parent tiles being assembled: (level, i, j) -> [tile, children still missing]
+    pending = {}
+
+    def add_child(level, i, j, downsampled):
+        """Place the downsampled level tile (i, j) into its parent, finishing the parent when complete"""
+        key = (level + 1, i // 2, j // 2)
+        if key not in pending:
+            grid = _tile_grid(shapes[level], tile_size)
+            n_children = (min(2, grid[0] - 2 * key[1]) * min(2, grid[1] - 2 * key[2]))
+            pending[key] = [np.empty(_tile_shape(shapes[level + 1], tile_size, *key[1:]), dtype=dtype),
+                            n_children]
+        parent = pending[key]
+        oy, ox = (i % 2) * half, (j % 2) * half
+        parent[0][oy:oy + downsampled.shape[0], ox:ox + downsampled.shape[1]] = downsampled
+        parent[1] -= 1
+        if parent[1] == 0:
+            del pending[key]
+            _write_tile(path, *key, parent[0], compression_level)
+            if key[0] < n_levels - 1:
+                add_child(*key, _downsample(parent[0]))
+
+    low, high = np.inf, -np.inf
+    n_workers = n_workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    try:
+        # Results arrive in Z-order, so only a few partial parents per level are ever pending
+        if executor:
+            results = _ordered_results(executor, _render_tile, tasks, window=4 * n_workers)
+        else:
+            results = map(_render_tile, tasks)
+        for (i, j), downsampled, (tile_low, tile_high) in results:
+            low, high = min(low, tile_low), max(high, tile_high)
+            if n_levels > 1:
+                add_child(0, i, j, downsampled)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    metadata = {
+        'shape': list(shape),
+        'levels': [list(s) for s in shapes],
+        'tile_size': tile_size,
+        'dtype': np.dtype(dtype).str,
+        'x_range': [float(v) for v in x_range],
+        'y_range': [float(v) for v in y_range],
+        'value_range': [low, high],
+        'params': {name: np.asarray(value).tolist() for name, value in (params or {}).items()},
+    }
+    with open(os.path.join(path, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f)
+
+    return open_tile_pyramid(path)
+
+class TilePyramid:
+    """
+    Lazy reader for a pyramid written by export_tile_pyramid.
+
+    region() picks the coarsest level that still resolves the requested window at the
+    requested pixel count and decompresses only the tiles overlapping it, so a viewer
+    can pan and zoom over maps far larger than memory.
+    """
+
+    def __init__(self, path, cache_size=256):
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+
+        self.shape = tuple(metadata['shape'])
+        self.levels = [tuple(s) for s in metadata['levels']]
+        self.tile_size = metadata['tile_size']
+        self.dtype = np.dtype(metadata['dtype'])
+        self.x_range = tuple(metadata['x_range'])
+        self.y_range = tuple(metadata['y_range'])
+        self.value_range = tuple(metadata['value_range'])
+        self.params = metadata['params']
+        self.tile = lru_cache(maxsize=cache_size)(self._read_tile)
+
+    @property
+    def spacing(self):
+        """Full-resolution sample spacing (dx, dy)"""
+        return ((self.x_range[1] - self.x_range[0]) / max(self.shape[1] - 1, 1),
+                (self.y_range[1] - self.y_range[0]) / max(self.shape[0] - 1, 1))
+
+    def _read_tile(self, level, i, j):
+        shape = _tile_shape(self.levels[level], self.tile_size, i, j)
+        with open(os.path.join(self.path, _tile_filename(level, i, j)), 'rb') as f:
+            data = zlib.decompress(f.read())
+        return np.frombuffer(data, dtype=self.dtype).reshape(shape)
+
+    def _pixels(self, level, coord_range, axis):
+        """Level pixel indices [start, stop) covering coord_range along axis (0 = y, 1 = x)"""
+        origin = (self.y_range, self.x_range)[axis][0]
+        step = self.spacing[1 - axis]
+        scale = 2**level
+        n = self.levels[level][axis]
+        # Level pixel p averages full-resolution samples p*scale ... p*scale + scale - 1
+        lo, hi = sorted((c - origin) / step if step else 0.0 for c in coord_range)
+        start = int(np.clip(np.floor((lo - (scale - 1) / 2) / scale), 0, n - 1))
+        stop = int(np.clip(np.ceil((hi - (scale - 1) / 2) / scale), start, n - 1)) + 1
+        return start, stop
+
+    def level_for(self, x_range, y_range, max_pixels=1024):
+        """Finest level showing the window with at most max_pixels along each axis"""
+        for level in range(len(self.levels)):
+            rows = self._pixels(level, y_range, 0)
+            cols = self._pixels(level, x_range, 1)
+            if rows[1] - rows[0] <= max_pixels and cols[1] - cols[0] <= max_pixels:
+                return level
+        return len(self.levels) - 1
+
+    def read(self, level, rows, cols):
+        """Pixels [rows[0], rows[1]) x [cols[0], cols[1]) of a level, assembled from its tiles"""
+        size = self.tile_size
+        out = np.empty((rows[1] - rows[0], cols[1] - cols[0]), dtype=self.dtype)
+        for i in range(rows[0] // size, -(-rows[1] // size)):
+            for j in range(cols[0] // size, -(-cols[1] // size)):
+                tile = self.tile(level, i, j)
+                r0, r1 = max(rows[0], i * size), min(rows[1], i * size + tile.shape[0])
+                c0, c1 = max(cols[0], j * size), min(cols[1], j * size + tile.shape[1])
+                out[r0 - rows[0]:r1 - rows[0], c0 - cols[0]:c1 - cols[0]] = \
+                    tile[r0 - i * size:r1 - i * size, c0 - j * size:c1 - j * size]
+        return out
+
+    def region(self, x_range=None, y_range=None, max_pixels=1024, level=None):
+        """
+        Values of the window x_range x y_range (default: the whole map) at the finest
+        level within max_pixels per axis, or at the given level. Returns (values, extent,
+        level) with extent = (left, right, bottom, top) pixel edges for imshow(origin='lower').
+        """
+        x_range = x_range or self.x_range
+        y_range = y_range or self.y_range
+        if level is None:
+            level = self.level_for(x_range, y_range, max_pixels)
+        rows = self._pixels(level, y_range, 0)
+        cols = self._pixels(level, x_range, 1)
+
+        scale = 2**level
+        dx, dy = self.spacing
+
+        def edges(pixels, origin, step):
+            # Centre of level pixel p is at full-resolution sample p*scale + (scale - 1)/2
+            return tuple(origin + step * (p * scale + (scale - 1) / 2 + offset * scale)
+                         for p, offset in ((pixels[0], -0.5), (pixels[1] - 1, 0.5)))
+
+        extent = edges(cols, self.x_range[0], dx) + edges(rows, self.y_range[0], dy)
+        return self.read(level, rows, cols), extent, level
+
+def open_tile_pyramid(path, cache_size=256):
+    """Open a tile pyramid for lazy, windowed reading"""
+    return TilePyramid(path, cache_size=cache_size)
+
+def propagation_tile(X, Y, t=5.0):
+    """Field of the 2D propagation scene in em_wave_propagation.py on one tile"""
+    return propagation_field_2d(np.hypot(X, Y), t)
+
+def phased_array_tile(X, Y, positions, wavelength=1.0, steer=None, t=None):
+    """
+    Near field of a PhasedArray on one tile: its steady-state snapshot (t=None) or the
+    field at time t. The array's distance tables only ever span a single tile.
+    """
+    array = PhasedArray(positions, (X, Y), wavelength=wavelength)
+    if steer is not None:
+        array.steer(steer)
+    if t is None:
+        return array.steady_state_phasor().imag.reshape(X.shape)
+    return array.field(t)
+
+if __name__ == "__main__":
+    import argparse
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    parser = argparse.ArgumentParser(description="Export a zoomable near-field map of a phased array")
+    parser.add_argument('--size', type=int, default=4096, help="Full-resolution pixels per side")
+    parser.add_argument('--elements', type=int, default=16, help="Number of array elements")
+    parser.add_argument('--output', default='phased_array_near_field_pyramid')
+    args = parser.parse_args()
+
+    params = {'positions': uniform_linear_array(args.elements, wavelength=0.5), 'wavelength': 0.5,
+              'steer': 30}
+    n_pixels = args.size * args.size
+    print(f"Exporting {args.size} x {args.size} ({n_pixels / 1e6:.0f} Mpixel) near-field map "
+          f"of a {args.elements}-element array...")
+    start = time.perf_counter()
+    pyramid = export_tile_pyramid(args.output, phased_array_tile, (-20, 20), (-20, 20),
+                                  (args.size, args.size), params=params)
+    elapsed = time.perf_counter() - start
+    print(f"{len(pyramid.levels)} levels written in {elapsed:.1f} s "
+          f"({n_pixels / elapsed / 1e6:.1f} Mpixel/s)")
+
+    # Zoom from the whole map down to a few wavelengths around the array
+    windows = [((-20, 20), (-20, 20)), ((-5, 5), (-5, 5)), ((-1, 1), (-1, 1))]
+    fig, axes = plt.subplots(1, len(windows), figsize=(6 * len(windows), 5.5))
+    vmax = max(abs(v) for v in pyramid.value_range)
+    for ax, (x_range, y_range) in zip(axes, windows):
+        start = time.perf_counter()
+        values, extent, level = pyramid.region(x_range, y_range, max_pixels=512)
+        print(f"Window x {x_range}, y {y_range}: level {level}, {values.shape[1]} x {values.shape[0]} "
+              f"pixels in {1000 * (time.perf_counter() - start):.1f} ms")
+        ax.imshow(values, extent=extent, origin='lower', cmap='RdBu_r', vmin=-vmax, vmax=vmax)
+        ax.set_title(f'Level {level} ({2**level}x downsampled)', fontsize=12)
+        ax.set_xlabel('X distance')
+        ax.set_ylabel('Y distance')
+    fig.suptitle('Phased-Array Near Field at Three Zoom Levels', fontsize=14, fontweight='bold')
+    plt.tight_layout()
+    plt.savefig('phased_array_near_field_zoom.png', dpi=100)
+    print("Zoom levels saved as phased_array_near_field_zoom.png")
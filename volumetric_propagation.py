@@ -0,0 +1,288 @@
+"""
+Volumetric 3D propagation: the field on a 3D grid streamed in z-slabs, reduced per frame
+to orthogonal slice planes and isosurfaces of the spherical wavefront
+"""
+
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+from animation_pipeline import export_animation_pipelined
+from draft_preview import FULL_QUALITY
+from em_wave_propagation import propagation_field_3d
+from gif_encoder import ScenePalette
+
+# Corner offsets (dz, dy, dx) of a grid cube and its split into six tetrahedra around the
+# 0-7 diagonal. Every cube is split the same way, so neighbouring cubes share faces exactly
+_CORNERS = np.array([[0, 0, 0], [0, 0, 1], [0, 1, 0], [0, 1, 1],
+                     [1, 0, 0], [1, 0, 1], [1, 1, 0], [1, 1, 1]])
+_TETRAHEDRA = np.array([[0, 1, 3, 7], [0, 3, 2, 7], [0, 2, 6, 7],
+                        [0, 6, 4, 7], [0, 4, 5, 7], [0, 5, 1, 7]])
+
+def _case_triangles():
+    """
+    Triangles of each of the 16 above/below-level cases of a tetrahedron (bit i set when
+    vertex i is above), every triangle corner given as the tetrahedron edge it lies on
+    """
+    table = {}
+    for case in range(1, 15):
+        above = [v for v in range(4) if case >> v & 1]
+        below = [v for v in range(4) if not case >> v & 1]
+        if len(above) == 1 or len(below) == 1:
+            (apex,), others = (above, below) if len(above) == 1 else (below, above)
+            table[case] = (above, below, [[(apex, other) for other in others]])
+        else:
+            # The surface cuts a quad; its corners in cyclic order are (i,k) (i,l) (j,l) (j,k)
+            (i, j), (k, l) = above, below
+            table[case] = (above, below, [[(i, k), (i, l), (j, l)], [(i, k), (j, l), (j, k)]])
+    return table
+
+_CASE_TRIANGLES = _case_triangles()
+
+def isosurface_triangles(volume, level, origin=(0.0, 0.0, 0.0), spacing=(1.0, 1.0, 1.0)):
+    """
+    Triangles (n, 3, 3) of the surface volume == level, as (x, y, z) corner points.
+
+    volume is indexed [z, y, x]; origin and spacing give the (z, y, x) position of
+    volume[0, 0, 0] and the grid step. Vectorized marching cubes in its tetrahedral form:
+    only cubes with corners on both sides of the level are visited, each is split into
+    six tetrahedra and every tetrahedron case is handled for all cubes at once. Triangles
+    face towards increasing values.
+    """
+    above = volume > level
+    nz, ny, nx = volume.shape
+    corners_above = [above[dz:nz - 1 + dz, dy:ny - 1 + dy, dx:nx - 1 + dx] for dz, dy, dx in _CORNERS]
+    crossing = np.logical_or.reduce(corners_above) & ~np.logical_and.reduce(corners_above)
+    cubes = np.argwhere(crossing)
+    if len(cubes) == 0:
+        return np.empty((0, 3, 3))
+
+    points = cubes[:, None, :] + _CORNERS[None]
+    values = volume[points[..., 0], points[..., 1], points[..., 2]].astype(np.float64)
+    points = points.astype(np.float64)
+
+    triangles = []
+    for tetrahedron in _TETRAHEDRA:
+        v, p = values[:, tetrahedron], points[:, tetrahedron]
+        cases = (v > level) @ (1 << np.arange(4))
+        for case, (case_above, case_below, case_triangles) in _CASE_TRIANGLES.items():
+            selected = np.flatnonzero(cases == case)
+            if selected.size == 0:
+                continue
+            vs, ps = v[selected], p[selected]
+            uphill = ps[:, case_above].mean(axis=1) - ps[:, case_below].mean(axis=1)
+            for edges in case_triangles:
+                corners = []
+                for a, b in edges:
+                    weight = (level - vs[:, a]) / (vs[:, b] - vs[:, a])
+                    corners.append(ps[:, a] + weight[:, None] * (ps[:, b] - ps[:, a]))
+                triangle = np.stack(corners, axis=1)
+                normal = np.cross(triangle[:, 1] - triangle[:, 0], triangle[:, 2] - triangle[:, 0])
+                # Reordering (z, y, x) to (x, y, z) below mirrors the winding, so face downhill here
+                flip = np.einsum('ij,ij->i', normal, uphill) > 0
+                triangle[flip] = triangle[flip][:, [0, 2, 1]]
+                triangles.append(triangle)
+
+    # Index space (z, y, x) to physical (x, y, z)
+    triangles = np.concatenate(triangles) * np.asarray(spacing) + np.asarray(origin)
+    return triangles[..., ::-1]
+
+def field_slabs(t, n_grid=256, extent=5.0, slab_size=16, field=propagation_field_3d, dtype=np.float32):
+    """
+    Yield (z0, slab): the radial field(R, t, out=...) on the n_grid^3 cube [-extent, extent]^3,
+    slab_size z-planes at a time, slab[k] being plane z0 + k.
+
+    Only one slab of distances and one of values are ever allocated, and both are reused
+    for every slab, so a consumer must copy whatever it keeps. Slabs wholly outside the
+    light cone R <= t are zero-filled without evaluating the field.
+    """
+    axis = np.linspace(-extent, extent, n_grid).astype(dtype)
+    X, Y = np.meshgrid(axis, axis)
+    rho_squared = X**2 + Y**2
+    R = np.empty((min(slab_size, n_grid), n_grid, n_grid), dtype=dtype)
+    values = np.empty_like(R)
+
+    for z0 in range(0, n_grid, slab_size):
+        z = axis[z0:z0 + slab_size]
+        r, slab = R[:len(z)], values[:len(z)]
+        if np.abs(z).min() > t:
+            slab.fill(0)
+        else:
+            np.add(rho_squared[None], (z**2)[:, None, None], out=r)
+            np.sqrt(r, out=r)
+            field(r, t, out=slab)
+        yield z0, slab
+
+class SliceCollector:
+    """The three orthogonal planes through grid index (k, j, i), gathered from streamed slabs"""
+
+    def __init__(self, n_grid, index=None):
+        self.k, self.j, self.i = index if index is not None else (n_grid // 2,) * 3
+        self.xy = None
+        self.xz = np.empty((n_grid, n_grid))
+        self.yz = np.empty((n_grid, n_grid))
+
+    def add(self, z0, slab):
+        if z0 <= self.k < z0 + len(slab):
+            self.xy = slab[self.k - z0].astype(np.float64)
+        self.xz[z0:z0 + len(slab)] = slab[:, self.j, :]
+        self.yz[z0:z0 + len(slab)] = slab[:, :, self.i]
+
+class IsosurfaceExtractor:
+    """
+    Isosurface of streamed slabs on every step-th grid point along each axis.
+
+    The last plane of each slab is carried over to the next, so cubes straddling slab
+    boundaries are triangulated exactly once and only one slab is needed at a time.
+    """
+
+    def __init__(self, level, axis, step=1):
+        self.level = level
+        self.axis = np.asarray(axis, dtype=np.float64)
+        self.step = step
+        self._carry = None
+        self._triangles = []
+
+    def add(self, z0, slab):
+        first = -z0 % self.step
+        planes = slab[first::self.step, ::self.step, ::self.step]
+        if len(planes) == 0:
+            return
+        z_index = z0 + first
+        if self._carry is not None:
+            planes = np.concatenate([self._carry, planes])
+            z_index -= self.step
+        self._carry = planes[-1:].copy()
+        if len(planes) < 2:
+            return
+
+        spacing = (self.axis[1] - self.axis[0]) * self.step
+        origin = (self.axis[z_index], self.axis[0], self.axis[0])
+        triangles = isosurface_triangles(planes, self.level, origin, (spacing,) * 3)
+        if len(triangles):
+            self._triangles.append(triangles.astype(np.float32))
+
+    def triangles(self):
+        return np.concatenate(self._triangles) if self._triangles else np.empty((0, 3, 3), dtype=np.float32)
+
+def compute_volumetric_frame(frame, n_grid=256, extent=5.0, dt=0.1, slab_size=16,
+                             iso_levels=(-0.3, 0.3), iso_step=8):
+    """
+    Physics stage of the volumetric animation: the field on an n_grid^3 grid streamed in
+    slabs and reduced to (frame, t, axis, (xy, xz, yz) center slices, one triangle array
+    per iso level). The isosurfaces use every iso_step-th grid point. Peak memory is a
+    few slabs, never the volume (512^3 in float32 would be 512 MB)
+    """
+    t = frame * dt
+    axis = np.linspace(-extent, extent, n_grid)
+    slices = SliceCollector(n_grid)
+    surfaces = [IsosurfaceExtractor(level, axis, iso_step) for level in iso_levels]
+
+    for z0, slab in field_slabs(t, n_grid, extent, slab_size):
+        slices.add(z0, slab)
+        for surface in surfaces:
+            surface.add(z0, slab)
+
+    return frame, t, axis, (slices.xy, slices.xz, slices.yz), [s.triangles() for s in surfaces]
+
+def build_volumetric_propagation_scene(compute_frame=None, frames=300, fps=60, dpi=80, figsize=(12, 9),
+                                       cmap='RdYlBu_r', draft=FULL_QUALITY, n_grid=256, iso_step=8):
+    """
+    Figure and pipeline stages of the volumetric 3D animation: filled-contour slice planes
+    through the source and translucent isosurfaces of the spherical wavefront, on the same
+    kind of rotating 3D axes as the enhanced 3D animation. compute_frame defaults to
+    compute_volumetric_frame on an n_grid^3 grid. draft (see draft_preview.DraftSettings)
+    thins the frames and the volume grid (keeping the isosurface sample spacing) and the
+    isosurface triangles
+    """
+    compute_frame, decimate = draft.compute_stage(compute_frame, compute_volumetric_frame, n_grid,
+                                                  iso_step=max(1, iso_step // draft.grid_step))
+    fig = plt.figure(figsize=figsize)
+    ax = fig.add_subplot(111, projection='3d')
+    levels = np.linspace(-1, 1, 21)
+    surface_colors = ['royalblue', 'crimson']
+
+    def draw_frame_volume(state):
+        frame, t, axis, (xy, xz, yz), surfaces = state
+        extent = axis[-1]
+        ax.clear()
+
+        # Slice planes through the source, drawn where they lie
+        A, B = np.meshgrid(*decimate(axis, axis))
+        xy, xz, yz = decimate(xy, xz, yz)
+        ax.contourf(A, B, xy, levels=levels, cmap=cmap, zdir='z', offset=0, alpha=0.6, extend='both')
+        ax.contourf(A, xz, B, levels=levels, cmap=cmap, zdir='y', offset=0, alpha=0.6, extend='both')
+        ax.contourf(yz, A, B, levels=levels, cmap=cmap, zdir='x', offset=0, alpha=0.6, extend='both')
+
+        for triangles, color in zip(surfaces, surface_colors):
+            triangles = triangles[::max(1, int(round(1 / draft.density)))]
+            if len(triangles):
+                ax.add_collection3d(Poly3DCollection(triangles, facecolors=color, linewidths=0,
+                                                     alpha=0.35, shade=True))
+
+        ax.scatter([0], [0], [0], color='red', s=300, label='Source', zorder=5)
+
+        ax.set_xlabel('X distance', fontsize=12)
+        ax.set_ylabel('Y distance', fontsize=12)
+        ax.set_zlabel('Z distance', fontsize=12)
+        ax.set_title(f'Volumetric EM Wave Propagation (t={t:.2f})\nSpherical wavefront inside the light cone',
+                     fontsize=14, fontweight='bold')
+
+        ax.set_xlim([-extent, extent])
+        ax.set_ylim([-extent, extent])
+        ax.set_zlim([-extent, extent])
+        ax.view_init(elev=20, azim=frame*0.75)
+        ax.legend(loc='upper right')
+
+    stages = {
+        'compute_frame': compute_frame,
+        'draw_frame': draw_frame_volume,
+        'frames': draft.frames(range(frames)),
+        'fps': fps,
+        'dpi': dpi,
+        'palette': ScenePalette(cmaps=[cmap], colors=['red'] + surface_colors),
+    }
+    return fig, stages
+
+def create_volumetric_animation_with_gif(save_gif=True, filename='em_wave_volumetric_propagation.gif',
+                                         compute_frame=compute_volumetric_frame, frames=300, fps=60,
+                                         dpi=80, figsize=(12, 9), cmap='RdYlBu_r', show=True):
+    """
+    Create the volumetric 3D animation and save as GIF.
+    compute_frame(frame) -> (frame, t, axis, slices, surfaces), e.g. compute_volumetric_frame
+    with a larger n_grid bound through functools.partial
+    """
+    fig, stages = build_volumetric_propagation_scene(compute_frame, frames, fps, dpi, figsize, cmap)
+
+    def animate_volume(frame):
+        stages['draw_frame'](compute_frame(frame))
+
+    anim = FuncAnimation(fig, animate_volume, frames=frames, interval=1000/fps, repeat=True, blit=False)
+
+    if save_gif:
+        print(f"Saving volumetric animation as {filename}...")
+        try:
+            export_animation_pipelined(fig, compute_frame, stages['draw_frame'],
+                                       stages['frames'], filename, fps=fps, dpi=dpi,
+                                       palette=stages['palette'])
+            print(f"Volumetric animation saved successfully as {filename}")
+        except Exception as e:
+            print(f"Error saving volumetric GIF: {e}")
+
+    if show:
+        plt.show()
+    return anim
+
+if __name__ == "__main__":
+    n_grid = 512
+    print(f"Streaming one {n_grid}^3 frame ({n_grid**3 * 4 / 2**20:.0f} MB as float32) in slabs...")
+    start = time.perf_counter()
+    _, t, _, _, surfaces = compute_volumetric_frame(40, n_grid=n_grid, iso_step=8)
+    print(f"t = {t:.1f}: {sum(len(s) for s in surfaces)} isosurface triangles "
+          f"in {time.perf_counter() - start:.1f} s")
+
+    print("\nCreating volumetric 3D animation at 60fps...")
+    create_volumetric_animation_with_gif(save_gif=True)